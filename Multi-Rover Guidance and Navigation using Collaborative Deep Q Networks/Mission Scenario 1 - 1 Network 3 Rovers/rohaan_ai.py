@@ -6,12 +6,14 @@
 import numpy as np
 import random
 import os # To save and load model
+import copy
+import threading
+import warnings
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import torch.optim as optim
 import torch.autograd as autograd
-from torch.autograd import Variable
 
 Temperature = 7
 Hidden_Layer_Size = 100
@@ -19,6 +21,7 @@ Memory_Samples = 100
 Reward_Window_Size = 100
 Learning_Rate = 0.01
 Capacity = 100000
+Sync_Period = 10 # Background learning updates between two refreshes of the policy used to act
 
 # Class defining Architecture of the Neural Network
 
@@ -36,40 +39,163 @@ class Network(nn.Module):
         q_values = self.fc2(x)          # Activating Output layer neurons
         return q_values
     
+# Acting Class: the network, the temperature and the draw of an action fused in one traced graph, run without autograd
+
+class Actor(nn.Module):
+    
+    def __init__(self, network):
+        super(Actor, self).__init__()
+        self.network = network
+        
+    def forward(self, state, noise):    # Gumbel-max: the argmax of Q * Temperature plus Gumbel noise -log(E), E ~ Exp(1), is a draw of softmax(Q * Temperature)
+        return torch.argmax(self.network(state) * Temperature - noise.exponential_().log_(), dim = 1)
+
+def trace_actor(network):   # The traced graph shares the parameters of the network, so it is traced once per network, not once per update
+    example = (torch.zeros(1, network.input_size), torch.empty(1, network.nb_action))
+    with warnings.catch_warnings():     # Tracing is deprecated in recent torch, but still the fastest acting path
+        warnings.simplefilter('ignore')
+        return torch.jit.trace(Actor(network), example, check_trace = False)
+
 # Experience Replay Class
 
 class ReplayMemory(object):
     
     def __init__(self, capacity):
         self.capacity = capacity    # Maximum states saved in memory at a time
-        self.memory = []            # Empty list of previous states
+        self.memory = None          # Preallocated tensors, one per element of an event, allocated at the first push
+        self.position = 0           # Index where the next event is written (ring buffer)
+        self.size = 0               # Number of events saved in memory
+        
+    def __len__(self):
+        return self.size
         
     def push(self, event):  # Function to save event to memory
-        self.memory.append(event)   # Event: Current State, Last State, Last Action, Last Reward
-        if len(self.memory) > self.capacity:
-            del self.memory[0]      # delete oldest state in memory
+        if self.memory is None:     # Event: Current State, Last State, Last Action, Last Reward, each of batch size 1
+            self.memory = [torch.zeros((self.capacity,) + tuple(x.shape[1:]), dtype = x.dtype) for x in event]
+        for buffer, x in zip(self.memory, event):
+            buffer[self.position] = x[0]    # overwrites the oldest state in memory once full
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        
+    def push_batch(self, events):   # Function to save N events to memory at once, each element with a leading dimension N
+        if self.memory is None:
+            self.memory = [torch.zeros((self.capacity,) + tuple(x.shape[1:]), dtype = x.dtype) for x in events]
+        n = events[0].shape[0]
+        indices = (self.position + torch.arange(n)) % self.capacity
+        for buffer, x in zip(self.memory, events):
+            buffer[indices] = x
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
             
     def sample(self, batch_size):   # Random Sampling function
-        samples = zip(*random.sample(self.memory, batch_size))      # Randomly sample memory for batch_size elements
-        return map(lambda x: Variable(torch.cat(x, 0)), samples)    # Restructure samples for pytorch
+        indices = torch.tensor(random.sample(range(self.size), batch_size))     # Randomly sample memory for batch_size elements
+        return [buffer.index_select(0, indices) for buffer in self.memory]      # One batch tensor per element of an event
+            
+# Learner Class: runs learn() in a background thread, on batches drained from the replay memory of an agent
+
+class Learner(object):
+    
+    def __init__(self, agent, updates_per_step):
+        self.agent = agent                          # Agent whose memory is sampled and whose model is trained
+        self.updates_per_step = updates_per_step    # learn() calls per update() call of the agent
+        self.condition = threading.Condition()      # Guards the replay memory, shared with the acting thread
+        self.steps = 0                              # update() calls of the agent
+        self.updates = 0                            # learn() calls done
+        self.running = True
+        self.thread = threading.Thread(target = self.run, daemon = True)
+        self.thread.start()
+        
+    def push(self, event):  # Saves an event to the memory of the agent, for the learner to catch up with
+        with self.condition:
+            self.agent.memory.push(event)
+            self.steps += 1
+            self.condition.notify()
+            
+    def push_batch(self, events):
+        with self.condition:
+            self.agent.memory.push_batch(events)
+            self.steps += 1
+            self.condition.notify()
+            
+    def ready(self):
+        return not self.running or (len(self.agent.memory) > Memory_Samples and self.updates < self.steps * self.updates_per_step)
+        
+    def run(self):
+        agent = self.agent
+        while True:
+            with self.condition:
+                self.condition.wait_for(self.ready)
+                if not self.running:
+                    return
+                batch_state, batch_next_state, batch_action, batch_reward = agent.memory.sample(Memory_Samples)
+            with agent.model_lock:
+                agent.learn(batch_state, batch_next_state, batch_reward, batch_action)
+            self.updates += 1
+            if self.updates % Sync_Period == 0:
+                agent.sync_policy()
+                
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
             
 # Deep Q Learning Class
 class Dqn():
     
-    def __init__(self, input_size, nb_action, gamma):
+    def __init__(self, input_size, nb_action, gamma, updates_per_step = None):
         self.gamma = gamma                                                      # Discount rate
         self.reward_window = []                                                 # Sliding window of rewards
         self.model = Network(input_size = input_size, nb_action = nb_action)    # Declaring new Neural Network
         self.memory = ReplayMemory(capacity = Capacity)                           # Declaring new Replay Memory object
         self.optimizer = optim.Adam(params = self.model.parameters(), lr = Learning_Rate) # Declaring Optimizer to use for Learning
-        self.last_state = torch.Tensor(input_size).unsqueeze(0)                  # Declaring and restructing last_state
+        self.state_buffers = [torch.zeros(1, input_size), torch.zeros(1, input_size)]   # Preallocated new states, each written over the states before last
+        self.last_state = self.state_buffers[1]                                 # Declaring and restructing last_state
+        self.noise = torch.empty(1, nb_action)                                  # Preallocated noise of the draw of an action
         self.last_action = 0                                                    # Declaring last_action
         self.last_reward = 0.0                                                  # Declaring last_reward
+        self.last_states = None                                                 # Last states, actions and rewards of the rovers sharing this network
+        self.last_actions = None
+        self.last_rewards = None
+        self.model_lock = threading.Lock()                                      # Guards the model and the optimizer against the learner thread
+        self.policies = [self.model]                                            # Networks used to act
+        self.learner = None
+        self.scheduled = False                                                  # True when the world schedules the learning with train(), instead of once per update()
+        if updates_per_step is not None:                                        # Learning in the background: acting uses two snapshots of the model, one refreshed while the other acts
+            self.policies = [copy.deepcopy(self.model), copy.deepcopy(self.model)]
+        self.actors = [trace_actor(policy) for policy in self.policies]         # Acting path of each policy, traced once
+        self.policy = self.policies[0]
+        self.actor = self.actors[0]
+        if updates_per_step is not None:
+            self.learner = Learner(self, updates_per_step)
+    
+    def sync_policy(self):  # Refreshes the idle snapshot in place, then swaps it in at once, so acting never waits
+        if self.learner is not None:
+            k = 1 - self.policies.index(self.policy)
+            with self.model_lock:
+                self.policies[k].load_state_dict(self.model.state_dict())
+            self.policy = self.policies[k]
+            self.actor = self.actors[k]
+    
+    def close(self):    # Stops the learner thread
+        if self.learner is not None:
+            self.learner.stop()
+    
+    def state_buffer(self, last_state, n):  # Preallocated tensor receiving n new states: the one of two buffers not holding the last states
+        buffers = self.state_buffers
+        if buffers[0].shape[0] != n:
+            buffers = self.state_buffers = [torch.zeros(n, buffers[0].shape[1]), torch.zeros(n, buffers[0].shape[1])]
+        return buffers[1] if last_state is buffers[0] else buffers[0]
     
     def select_action(self, state): # State is the current state vector: 3 signals, Orientation, and Negative Orientation
-        probs = F.softmax(self.model(Variable(state, volatile = True))*Temperature)       # Probability distribution of actions with Temperature
-        action = probs.multinomial(1)       # Take random draw from the probability distribution
-        return action.data[0, 0]
+        with torch.inference_mode():
+            return self.actor(state, self.noise)[0]     # Random draw from the probability distribution of actions with Temperature
+    
+    def select_actions(self, states): # States of N rovers, (N, 5): one forward pass for N actions
+        if self.noise.shape[0] != states.shape[0]:
+            self.noise = torch.empty(states.shape[0], self.noise.shape[1])
+        with torch.inference_mode():
+            return self.actor(states, self.noise)     # One random draw per rover
     
     def learn(self, batch_state, batch_next_state, batch_reward, batch_action): # Learning function
         outputs = self.model(batch_state).gather(1, batch_action.unsqueeze(1)).squeeze(1)
@@ -80,14 +206,27 @@ class Dqn():
         td_loss.backward(retain_graph = True)   # Perform back propagation
         self.optimizer.step()                   # Update weights
         
-    def update(self, reward, new_signal):
-        new_state = torch.Tensor(new_signal).float().unsqueeze(0)   # New state is current signals and orientation
-        # Save new state to memory
-        self.memory.push((self.last_state, new_state, torch.LongTensor([int(self.last_action)]), torch.Tensor([self.last_reward])))
-        action = self.select_action(new_state) # select next action to take
-        if len(self.memory.memory) > Memory_Samples:       # Begin learning after 100 states have been transitioned
+    def train(self, updates):   # learn() calls on batches of the replay memory, when the world schedules the learning; returns the calls done
+        if len(self.memory) <= Memory_Samples:
+            return 0
+        for k in range(updates):
             batch_state, batch_next_state, batch_action, batch_reward = self.memory.sample(Memory_Samples)
             self.learn(batch_state, batch_next_state, batch_reward, batch_action)
+        return updates
+        
+    def update(self, reward, new_signal):
+        new_state = self.state_buffer(self.last_state, 1)   # New state is current signals and orientation
+        new_state.numpy()[0] = new_signal
+        event = (self.last_state, new_state, torch.LongTensor([int(self.last_action)]), torch.Tensor([self.last_reward]))
+        if self.learner is not None:            # Save new state to memory, the learner thread learns from it
+            self.learner.push(event)
+            action = self.select_action(new_state) # select next action to take
+        else:                                   # Save new state to memory and learn right away
+            self.memory.push(event)
+            action = self.select_action(new_state)
+            if not self.scheduled and len(self.memory) > Memory_Samples:       # Begin learning after 100 states have been transitioned
+                batch_state, batch_next_state, batch_action, batch_reward = self.memory.sample(Memory_Samples)
+                self.learn(batch_state, batch_next_state, batch_reward, batch_action)
         self.last_action = action               # Update all current state variables
         self.last_state = new_state
         self.last_reward = reward
@@ -96,26 +235,53 @@ class Dqn():
             del self.reward_window[0]
         return action
     
+    def update_batch(self, rewards, new_signals): # Same as update, for N rovers sharing this network
+        new_states = self.state_buffer(self.last_states, len(new_signals))     # (N, 5)
+        new_states.numpy()[:] = new_signals
+        if self.last_states is None or self.last_states.shape != new_states.shape:
+            self.last_states = torch.zeros(new_states.shape)
+            self.last_actions = torch.zeros(new_states.shape[0], dtype = torch.long)
+            self.last_rewards = torch.zeros(new_states.shape[0])
+        events = (self.last_states, new_states, self.last_actions, self.last_rewards)
+        if self.learner is not None:            # Save the N new states to memory, the learner thread learns from them
+            self.learner.push_batch(events)
+            actions = self.select_actions(new_states) # select next action of every rover
+        else:                                   # Save the N new states to memory and learn right away
+            self.memory.push_batch(events)
+            actions = self.select_actions(new_states)
+            if not self.scheduled and len(self.memory) > Memory_Samples:       # Begin learning after 100 states have been transitioned
+                batch_state, batch_next_state, batch_action, batch_reward = self.memory.sample(Memory_Samples)
+                self.learn(batch_state, batch_next_state, batch_reward, batch_action)
+        self.last_actions = actions               # Update all current state variables
+        self.last_states = new_states
+        self.last_rewards = torch.Tensor(rewards)
+        self.reward_window.extend(rewards)
+        del self.reward_window[:-Reward_Window_Size]   # Keep only the last rewards in the sliding reward window
+        return actions.tolist()
+    
     def score(self):    # Returns average reward of the reward window
         rew = sum(self.reward_window)/(len(self.reward_window) + 1.0)
         #print('Avg Reward ' + str(rew), 'Last Reward: ' + str(self.reward_window[-1]))
         return rew
         
     
-    def save(self):
-        torch.save({'state_dict': self.model.state_dict(),
-                    'optimizer': self.optimizer.state_dict(),},
-                    'last_brain.pth')
+    def save(self, path = 'last_brain.pth'):
+        with self.model_lock:
+            torch.save({'state_dict': self.model.state_dict(),
+                        'optimizer': self.optimizer.state_dict(),},
+                        path)
     
-    def load(self):
-        if os.path.isfile('last_brain.pth'):
+    def load(self, path = 'last_brain.pth'):
+        if os.path.isfile(path):
             print('=> Loading Model...')
-            checkpoint = torch.load('last_brain.pth')
-            self.model.load_state_dict(checkpoint['state_dict'])
-            self.optimizer.load_state_dict(checkpoint['optimizer'])
+            checkpoint = torch.load(path)
+            with self.model_lock:
+                self.model.load_state_dict(checkpoint['state_dict'])
+                self.optimizer.load_state_dict(checkpoint['optimizer'])
+            self.sync_policy()
             print('Load Completed')
         else:
-            print('No file named last_brain.pth found')
+            print('No file named ' + path + ' found')
                 
         
     
@@ -0,0 +1,151 @@
+# Benchmarks of Mission Scenario 1
+# Throughput of the simulation and latency of the AI over a pinned scenario (sand layout, goals and seeds),
+# written to a JSON file so that two runs can be diffed
+
+# Importing the libraries
+import argparse
+import json
+import platform
+import random
+import resource
+import time
+
+import numpy as np
+import torch
+
+from rohaan_ai import Dqn, ReplayMemory, Memory_Samples, Capacity
+from rohaan_mission import make_world, make_vec_env
+from rohaan_vec import act, brain_groups
+
+Map_Width = 1000
+Map_Height = 800
+Sand_Layout = [(300, 420, 150, 650), (600, 900, 500, 560), (100, 250, 80, 200)]   # Rectangles [x0, x1) x [y0, y1) of sand
+Rover_Counts = [1, 3, 10, 50]
+World_Counts = [1, 8, 32]
+Shard_Counts = [1, 2, 4]
+Shard_Rovers = 500         # Rovers of the sharded world, enough for the strips to share the work
+Batch_Sizes = [32, 100, 256, 1024]
+
+def seed_everything(seed):  # The goals come from the seed of the world; the actions and samples from these generators
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+def timeit(function, repeats):  # Median latency of function() in microseconds
+    function()      # Warm up
+    times = []
+    for r in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1e6
+
+def peak_rss():     # Peak resident memory of this process in megabytes (ru_maxrss is in kilobytes on Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+def pinned_world(n_rovers, seed, shards = None):
+    seed_everything(seed)
+    world = make_world(Map_Width, Map_Height, n_rovers = n_rovers, seed = seed, verbose = False, shards = shards)
+    for x0, x1, y0, y1 in Sand_Layout:
+        world.fill_sand(x0, x1, y0, y1, 1)
+    return world
+
+def bench_ticks(n_rovers, steps, seed):     # Ticks per second of the whole world, learning included
+    world = pinned_world(n_rovers, seed)
+    start = time.perf_counter()
+    for t in range(steps):
+        world.step()
+    elapsed = time.perf_counter() - start
+    world.fleet.brains[0].close()
+    return {'rovers': n_rovers, 'steps': steps, 'ticks_per_s': steps / elapsed,
+            'goals': world.total_goals_achieved, 'collisions': world.total_collisions}
+
+def bench_shards(n_shards, n_rovers, steps, seed):  # Ticks per second of the world cut into n_shards strips, once its workers started
+    world = pinned_world(n_rovers, seed, shards = n_shards)
+    world.step()
+    start = time.perf_counter()
+    for t in range(steps):
+        world.step()
+    elapsed = time.perf_counter() - start
+    world.close()
+    world.fleet.brains[0].close()
+    return {'shards': n_shards, 'rovers': n_rovers, 'steps': steps, 'ticks_per_s': steps / elapsed,
+            'goals': world.total_goals_achieved, 'collisions': world.total_collisions}
+
+def bench_vec(n_worlds, steps, seed):     # Transitions per second of worlds stepped in lockstep, learning included
+    seed_everything(seed)
+    env, brains = make_vec_env(n_worlds, Map_Width, Map_Height, seed = seed)
+    for x0, x1, y0, y1 in Sand_Layout:
+        env.fill_sand(x0, x1, y0, y1, 1)
+    groups = brain_groups(brains)
+    observations = env.reset()
+    rewards = np.zeros((n_worlds, env.n_rovers))
+    start = time.perf_counter()
+    for t in range(steps):
+        observations, rewards = env.step(act(groups, rewards, observations))
+    elapsed = time.perf_counter() - start
+    return {'worlds': n_worlds, 'rovers': env.n_rovers, 'steps': steps, 'transitions_per_s': steps * n_worlds * env.n_rovers / elapsed,
+            'goals': int(env.goals_achieved.sum()), 'collisions': int(env.collisions.sum())}
+
+def filled_memory(size):    # Replay memory holding size random events
+    memory = ReplayMemory(Capacity)
+    memory.push_batch((torch.randn(size, 5), torch.randn(size, 5), torch.randint(3, (size,)), torch.randn(size)))
+    return memory
+
+def bench_brain(repeats, seed):
+    seed_everything(seed)
+    brain = Dqn(5, 3, 0.9)
+    state = torch.randn(1, 5)
+    states = torch.randn(10, 5)
+    memory = filled_memory(Memory_Samples * 100)
+    event = (torch.randn(1, 5), torch.randn(1, 5), torch.LongTensor([1]), torch.Tensor([0.5]))
+    results = {'select_action_us': timeit(lambda: brain.select_action(state), repeats),
+               'select_actions_10_us': timeit(lambda: brain.select_actions(states), repeats),
+               'memory_push_us': timeit(lambda: memory.push(event), repeats),
+               'memory_sample_us': timeit(lambda: memory.sample(Memory_Samples), repeats),
+               'learn_us': {}}
+    for batch_size in Batch_Sizes:
+        batch_state, batch_next_state, batch_action, batch_reward = memory.sample(batch_size)
+        results['learn_us'][str(batch_size)] = timeit(lambda: brain.learn(batch_state, batch_next_state, batch_reward, batch_action), repeats)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Benchmark the simulation and the AI of Mission Scenario 1 over a pinned scenario.')
+    parser.add_argument('--steps', type = int, default = 1000, help = 'timesteps simulated per rover count')
+    parser.add_argument('--rovers', type = int, nargs = '+', default = Rover_Counts, help = 'rover counts to simulate')
+    parser.add_argument('--worlds', type = int, nargs = '+', default = World_Counts, help = 'world counts stepped in lockstep')
+    parser.add_argument('--shards', type = int, nargs = '*', default = Shard_Counts, help = 'strip counts of the sharded world')
+    parser.add_argument('--shard-rovers', type = int, default = Shard_Rovers, help = 'rovers of the sharded world')
+    parser.add_argument('--repeats', type = int, default = 200, help = 'timed calls per latency')
+    parser.add_argument('--seed', type = int, default = 0, help = 'seed of the goals, actions and samples')
+    parser.add_argument('--output', default = 'plots/benchmark.json', help = 'JSON file receiving the results')
+    args = parser.parse_args()
+
+    results = {'mission': 'Mission Scenario 1', 'seed': args.seed, 'steps': args.steps, 'repeats': args.repeats,
+               'python': platform.python_version(), 'numpy': np.__version__, 'torch': torch.__version__,
+               'machine': platform.machine(), 'threads': torch.get_num_threads(), 'ticks': []}
+    for n_rovers in args.rovers:
+        ticks = bench_ticks(n_rovers, args.steps, args.seed)
+        print('{0:>3} rovers: {1:8.0f} ticks/s'.format(n_rovers, ticks['ticks_per_s']))
+        results['ticks'].append(ticks)
+    results['vec'] = []
+    for n_worlds in args.worlds:
+        vec = bench_vec(n_worlds, args.steps, args.seed)
+        print('{0:>3} worlds: {1:8.0f} transitions/s'.format(n_worlds, vec['transitions_per_s']))
+        results['vec'].append(vec)
+    results['shards'] = []
+    for n_shards in args.shards:
+        shards = bench_shards(n_shards, args.shard_rovers, args.steps, args.seed)
+        print('{0:>3} shards: {1:8.0f} ticks/s ({2} rovers)'.format(n_shards, shards['ticks_per_s'], args.shard_rovers))
+        results['shards'].append(shards)
+    results['brain'] = bench_brain(args.repeats, args.seed)
+    results['peak_rss_mb'] = peak_rss()
+    for name, value in results['brain'].items():
+        print('{0}: {1}'.format(name, value if isinstance(value, dict) else '{0:.1f}'.format(value)))
+    print('peak_rss_mb: {0:.1f}'.format(results['peak_rss_mb']))
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent = 2, sort_keys = True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# Evaluation tournament of Mission Scenario 1
+# Runs saved rover networks greedily, without learning, over the same randomized goal sequences and sand maps,
+# in a pool of worker processes, and compares their goals per timestep, collisions and times to goal
+
+# Importing the libraries
+import argparse
+import glob
+import json
+import multiprocessing
+import time
+
+import numpy as np
+import torch
+
+from rohaan_maps import load_map
+from rohaan_mission import REWARDS, COLLISION_RADIUS, start_positions
+from rohaan_quantize import load_network
+from rohaan_vec import RoverVecEnv
+
+Sand_Patches = 6                # Most rectangles of sand of a random map
+Patch_Sizes = (40, 240)         # Smallest and largest side of a rectangle
+Percentiles = [10, 50, 90]
+
+def load_policy(path):  # A saved rover network, or a TorchScript model such as the int8 ones of rohaan_quantize.py
+    if path.endswith('.pt'):
+        return torch.jit.load(path)
+    return load_network(path)
+
+def random_sand(env, world, rng):   # Random rectangles of sand in one world of env
+    for k in range(rng.integers(Sand_Patches, endpoint = True)):
+        w, h = rng.integers(Patch_Sizes[0], Patch_Sizes[1], size = 2, endpoint = True)
+        x0 = rng.integers(env.width - w)
+        y0 = rng.integers(env.height - h)
+        env.fill_sand(x0, x0 + w, y0, y0 + h, 1, world = world)
+
+def layout_env(layouts, width, height, n_rovers, seed, sand_map = None):    # One world per layout: its sand drawn from the layout, or a standard map, its goals from the seed of the chunk
+    positions, velocities = start_positions(width, height, n_rovers)     # The worlds of make_vec_env, without its brain
+    env = RoverVecEnv(len(layouts), width, height, positions, velocities, REWARDS, COLLISION_RADIUS, seed = seed)
+    if sand_map is not None:
+        env.load_sand(load_map(sand_map, width, height))
+        return env
+    for world, layout in enumerate(layouts):
+        random_sand(env, world, np.random.default_rng([seed, layout]))
+    return env
+
+# Worker process: one checkpoint over one chunk of layouts, stepped in lockstep
+
+def evaluate_chunk(task):
+    path, layouts, width, height, n_rovers, steps, seed, sand_map = task
+    torch.set_num_threads(1)    # One core per worker
+    policy = load_policy(path)
+    env = layout_env(layouts, width, height, n_rovers, seed, sand_map)
+    observations = env.reset()
+    last_goal = np.zeros(env.n_worlds * env.n_rovers, dtype = int)  # Timestep of the last goal of each rover, or of its start
+    goals = env.goals_achieved.ravel().copy()
+    times = []
+    with torch.inference_mode():
+        for t in range(1, steps + 1):
+            states = torch.from_numpy(observations.reshape(-1, observations.shape[-1]).astype(np.float32))
+            actions = policy(states).argmax(1).numpy()      # Greedy: the action of highest Q-value
+            observations, rewards = env.step(actions.reshape(env.n_worlds, env.n_rovers))
+            reached = np.flatnonzero(env.goals_achieved.ravel() != goals)
+            if len(reached):
+                times.extend((t - last_goal[reached]).tolist())
+                last_goal[reached] = t
+                goals[reached] = env.goals_achieved.ravel()[reached]
+    return {'path': path, 'layouts': list(layouts), 'goals': env.goals_achieved.sum(axis = 1).tolist(),
+            'collisions': env.collisions.tolist(), 'rovers': env.goals_achieved.size, 'idle_rovers': int((env.goals_achieved == 0).sum()), 'times_to_goal': times}
+
+# Tournament: every checkpoint over every layout, the chunks spread over the pool
+
+def tournament(paths, n_layouts, chunk, width, height, n_rovers, steps, seed, processes, sand_map = None):
+    chunks = [list(range(start, min(start + chunk, n_layouts))) for start in range(0, n_layouts, chunk)]
+    tasks = [(path, layouts, width, height, n_rovers, steps, seed + c, sand_map) for path in paths for c, layouts in enumerate(chunks)]
+    goals = dict((path, np.zeros(n_layouts)) for path in paths)
+    collisions = dict((path, np.zeros(n_layouts)) for path in paths)
+    idle = dict((path, 0) for path in paths)
+    rovers = dict((path, 0) for path in paths)
+    times = dict((path, []) for path in paths)
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes) as pool:
+        for result in pool.imap_unordered(evaluate_chunk, tasks):
+            path = result['path']
+            goals[path][result['layouts']] = result['goals']
+            collisions[path][result['layouts']] = result['collisions']
+            idle[path] += result['idle_rovers']
+            rovers[path] += result['rovers']
+            times[path].extend(result['times_to_goal'])
+    best = np.max([goals[path] for path in paths], axis = 0)
+    results = {}
+    for path in paths:
+        score = goals[path] / steps     # Goals of all the rovers per timestep, on each layout
+        results[path] = {'goals_per_timestep': summary(score),
+                         'collisions_per_1000_timesteps': summary(collisions[path] * 1000. / steps),
+                         'time_to_goal': summary(np.array(times[path])),
+                         'idle_rovers': idle[path] / float(rovers[path]),   # Share of rovers reaching no goal at all
+                         'wins': int((goals[path] == best).sum())}       # Layouts on which no other checkpoint did better
+    return results
+
+def summary(values):    # Mean, standard deviation and percentiles of a distribution
+    if len(values) == 0:
+        return {'count': 0}
+    result = {'count': len(values), 'mean': float(values.mean()), 'std': float(values.std())}
+    for p, value in zip(Percentiles, np.percentile(values, Percentiles)):
+        result['p' + str(p)] = float(value)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Compare saved rover networks of Mission Scenario 1 by running them greedily on random layouts.')
+    parser.add_argument('checkpoints', nargs = '*', default = ['last_brain.pth'], help = 'saved rover networks, patterns such as brains/*.pth, or int8 models (.pt) of rohaan_quantize.py')
+    parser.add_argument('--layouts', type = int, default = 200, help = 'random goal sequences and sand maps played by every checkpoint')
+    parser.add_argument('--steps', type = int, default = 2000, help = 'timesteps of each layout')
+    parser.add_argument('--rovers', type = int, default = 3, help = 'number of rovers')
+    parser.add_argument('--width', type = int, default = 1000, help = 'width of the map')
+    parser.add_argument('--height', type = int, default = 800, help = 'height of the map')
+    parser.add_argument('--map', default = None, help = 'PNG mask or .npy heightmap of the sand of every layout, instead of random sand (see rohaan_maps.py)')
+    parser.add_argument('--chunk', type = int, default = 25, help = 'layouts stepped in lockstep by a worker per task')
+    parser.add_argument('--processes', type = int, default = multiprocessing.cpu_count(), help = 'number of worker processes')
+    parser.add_argument('--seed', type = int, default = 0, help = 'seed of the layouts, the same for every checkpoint')
+    parser.add_argument('--results', default = None, help = 'JSON file receiving the distributions of every checkpoint')
+    args = parser.parse_args()
+
+    paths = sorted(set(path for pattern in args.checkpoints for path in (glob.glob(pattern) or [pattern])))
+    if args.map is not None:
+        load_map(args.map, args.width, args.height)     # Rasterized once, the workers reading it from the cache
+    start = time.time()
+    results = tournament(paths, args.layouts, args.chunk, args.width, args.height, args.rovers, args.steps, args.seed, args.processes, args.map)
+    print('{0} checkpoints x {1} layouts x {2} timesteps in {3:.0f}s'.format(len(paths), args.layouts, args.steps, time.time() - start))
+    print('{0:>30} {1:>16} {2:>12} {3:>22} {4:>6} {5:>5}'.format('checkpoint', 'goals/timestep', 'coll./1000t', 'time to goal p10/50/90', 'idle', 'wins'))
+    for path in sorted(paths, key = lambda path: -results[path]['goals_per_timestep']['mean']):
+        result = results[path]
+        score = result['goals_per_timestep']
+        time_to_goal = result['time_to_goal']
+        print('{0:>30} {1:>8.4f} ±{2:<7.4f} {3:>12.2f} {4:>22} {5:>6.1%} {6:>5}'.format(
+            path[-30:], score['mean'], score['std'], result['collisions_per_1000_timesteps']['mean'],
+            '/'.join('{0:.0f}'.format(time_to_goal['p' + str(p)]) for p in Percentiles) if time_to_goal['count'] else '-',
+            result['idle_rovers'], result['wins']))
+    if args.results is not None:
+        with open(args.results, 'w') as f:
+            json.dump({'layouts': args.layouts, 'steps': args.steps, 'rovers': args.rovers, 'seed': args.seed, 'map': args.map, 'checkpoints': results},
+                      f, indent = 2, sort_keys = True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# Mission Scenario 1 - 1 Network 3 Rovers
+# Builds the rover world of this mission, and trains it headless when run as a script
+
+# Importing the libraries
+import argparse
+import math
+import time
+
+import numpy as np
+
+from rohaan_ai import Dqn
+from rohaan_world import RoverFleet, RoverWorld, SensorArray, TickScheduler, Car_Speed, Sensor_Distance
+from rohaan_telemetry import Telemetry, world_columns, world_row
+from rohaan_shard import ShardedWorld
+from rohaan_maps import load_map
+from rohaan_terrain import ChunkedTerrain
+from rohaan_transitions import TransitionLog
+from rohaan_vec import RoverVecEnv, act, brain_groups
+
+# Rewards
+LIVING_PENALTY = -0.2 # Penalty for not achieving the goal
+GETTING_CLOSER_BONUS = 0.1 # Reward for getting closer to goal
+COLLISION_PENALTY = 15 # Penalty for colling with the other car
+SAND_PENALTY = -1.5 # Penalty for going over sand-trap
+WALL_PENALTY = -1 # Penalty for touching the edges of the map
+GOAL_REWARD = 1 # Reward for reaching the goal
+
+COLLISION_RADIUS = 10 # Rovers closer than this (on both axes) collide
+SCORE_PERIOD = 10 # Timesteps between two points of the score curves
+
+def start_positions(width, height, n_rovers):   # Positions and velocities of the rovers when the mission starts
+    center_x = width / 2
+    center_y = height / 2
+    positions = [(center_x, center_y - 20), (center_x, center_y + 20), (center_x, center_y)]
+    velocities = [(Car_Speed, 0), (-Car_Speed, 0), (0, Car_Speed)]
+    radius = min(width, height) / 4
+    for i in range(3, n_rovers):    # The other rovers start on a circle around the center, driving along it
+        angle = 2 * math.pi * i / n_rovers
+        positions.append((center_x + radius * math.cos(angle), center_y + radius * math.sin(angle)))
+        velocities.append((-Car_Speed * math.sin(angle), Car_Speed * math.cos(angle)))
+    return positions[:n_rovers], velocities[:n_rovers]
+
+REWARDS = {'living': LIVING_PENALTY, 'closer': GETTING_CLOSER_BONUS, 'sand': SAND_PENALTY,
+           'wall': WALL_PENALTY, 'collision': COLLISION_PENALTY, 'goal': GOAL_REWARD}
+
+def make_world(width, height, n_rovers = 3, seed = None, verbose = True, updates_per_step = None, terrain = None, scheduler = None, sensors = None, shards = None):
+    sensors = sensors if sensors is not None else SensorArray()   # 3 sensors by default
+    brain = Dqn(len(sensors) + 2,3,0.9, updates_per_step = updates_per_step) # sensors and orientations, 3 actions, gama = 0.9, shared by all the rovers which act in one batch
+    positions, velocities = start_positions(width, height, n_rovers)
+    fleet = RoverFleet([brain] * n_rovers, positions, velocities, REWARDS, sensor_array = sensors)
+    if shards is not None:     # The map cut into strips moved by worker processes, its sand in shared memory
+        return ShardedWorld(width, height, fleet, COLLISION_RADIUS, SCORE_PERIOD, shards = shards, seed = seed, verbose = verbose, scheduler = scheduler)
+    return RoverWorld(width, height, fleet, COLLISION_RADIUS, SCORE_PERIOD, seed = seed, verbose = verbose, terrain = terrain, scheduler = scheduler)
+
+def make_vec_env(n_worlds, width, height, n_rovers = 3, seed = None, updates_per_step = None, sensors = None):  # n_worlds copies of the mission, and the brain of each rover
+    sensors = sensors if sensors is not None else SensorArray()
+    brain = Dqn(len(sensors) + 2,3,0.9, updates_per_step = updates_per_step) # shared by all the rovers of all the worlds, which act in one batch
+    positions, velocities = start_positions(width, height, n_rovers)
+    env = RoverVecEnv(n_worlds, width, height, positions, velocities, REWARDS, COLLISION_RADIUS, sensor_array = sensors, seed = seed)
+    return env, [brain] * n_rovers
+
+# Running many worlds at once without any display
+
+def run_vec(env, brains, steps, report):  # Steps every world of env in lockstep, each brain acting for its rovers of every world at once
+    groups = brain_groups(brains)
+    observations = env.reset()
+    rewards = np.zeros((env.n_worlds, env.n_rovers))
+    start = time.time()
+    for t in range(1, steps + 1):
+        observations, rewards = env.step(act(groups, rewards, observations))
+        if t % report == 0:
+            print('Timestep: {0}  Worlds: {1}  Goals: {2}  Collisions: {3}  Transitions/s: {4:.0f}'.format(
+                env.timestep, env.n_worlds, env.goals_achieved.sum(), env.collisions.sum(), t * env.n_worlds * env.n_rovers / (time.time() - start)))
+
+# Running the mission without any display
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Train the rovers of Mission Scenario 1 without the Kivy viewer.')
+    parser.add_argument('--steps', type = int, default = 100000, help = 'number of timesteps to simulate')
+    parser.add_argument('--width', type = int, default = 1000, help = 'width of the map')
+    parser.add_argument('--height', type = int, default = 800, help = 'height of the map')
+    parser.add_argument('--rovers', type = int, default = 3, help = 'number of rovers')
+    parser.add_argument('--updates-per-step', type = float, default = None, help = 'learn in a background thread, with this many updates per timestep')
+    parser.add_argument('--seed', type = int, default = None, help = 'seed of the goals')
+    parser.add_argument('--telemetry', default = None, help = 'CSV file receiving the training metrics, with the plots saved next to it')
+    parser.add_argument('--terrain', default = None, help = 'directory of a chunked, memory-mapped sand map, for maps too large for the memory')
+    parser.add_argument('--tick-budget', type = float, default = None, help = 'milliseconds per timestep: learn as much as fits in them, instead of once per timestep')
+    parser.add_argument('--rays', type = int, default = None, help = 'sensor rays fanned around each rover, instead of the 3 sensors at 0, 30 and -30 degrees')
+    parser.add_argument('--fan', type = float, default = 60., help = 'degrees covered by the rays')
+    parser.add_argument('--ray-samples', type = int, default = 1, help = 'sand samples along each ray')
+    parser.add_argument('--sensor-range', type = float, default = Sensor_Distance, help = 'length of the rays')
+    parser.add_argument('--map', default = None, help = 'PNG mask or .npy heightmap of the sand, rasterized to the map and cached (see rohaan_maps.py)')
+    parser.add_argument('--invert-map', action = 'store_true', help = 'dark or low pixels of the map are sand')
+    parser.add_argument('--log', default = None, help = 'binary log receiving the transitions of the rovers, appended to if it exists (see rohaan_pretrain.py)')
+    parser.add_argument('--worlds', type = int, default = None, help = 'step this many independent worlds in lockstep, the rovers of every world acting in one batch (no telemetry, log, terrain or tick budget)')
+    parser.add_argument('--shards', type = int, default = None, help = 'cut the map into this many strips, each moved by a worker process, for hundreds of rovers (no terrain)')
+    parser.add_argument('--report', type = int, default = 1000, help = 'timesteps between two progress reports')
+    args = parser.parse_args()
+    if args.worlds is not None and (args.telemetry or args.terrain or args.tick_budget or args.log):
+        parser.error('--worlds runs without --telemetry, --log, --terrain and --tick-budget')
+    if args.shards is not None and (args.terrain or args.worlds is not None):
+        parser.error('--shards runs without --terrain and --worlds')
+
+    sensors = None
+    if args.rays is not None:
+        sensors = SensorArray.fan(args.rays, args.fan, args.sensor_range, args.ray_samples)
+    if args.worlds is not None:
+        env, brains = make_vec_env(args.worlds, args.width, args.height, n_rovers = args.rovers, seed = args.seed,
+                                   updates_per_step = args.updates_per_step, sensors = sensors)
+        if args.map is not None:
+            env.load_sand(load_map(args.map, args.width, args.height, invert = args.invert_map))
+        run_vec(env, brains, args.steps, args.report)
+        brains[0].close()
+        brains[0].save()
+        return
+    terrain = None
+    if args.terrain is not None:
+        terrain = ChunkedTerrain(args.width, args.height, path = args.terrain)
+    scheduler = None
+    if args.tick_budget is not None:
+        scheduler = TickScheduler(budget = args.tick_budget / 1000.)
+    world = make_world(args.width, args.height, n_rovers = args.rovers, seed = args.seed, verbose = False,
+                       updates_per_step = args.updates_per_step, terrain = terrain,
+                       scheduler = scheduler, sensors = sensors, shards = args.shards)
+    if args.map is not None:
+        world.load_sand(load_map(args.map, args.width, args.height, invert = args.invert_map))
+    if args.log is not None:
+        world.transition_log = TransitionLog(args.log, len(world.fleet.sensor_array) + 2)     # States: signals and orientations
+    telemetry = None
+    if args.telemetry is not None:
+        telemetry = Telemetry(world_columns(world), args.telemetry)
+    start = time.time()
+    for t in range(1, args.steps + 1):
+        world.step()
+        if telemetry is not None:
+            telemetry.record(world_row(world))
+        if t % args.report == 0:
+            report = 'Timestep: {0}  Goals: {1}  Collisions: {2}  Ticks/s: {3:.0f}'.format(
+                world.timestep, world.total_goals_achieved, world.total_collisions, t / (time.time() - start))
+            if scheduler is not None:
+                report += '  Updates/Step: {0:.2f}'.format(scheduler.ratio())
+            print(report)
+    if telemetry is not None:
+        telemetry.close()
+    world.terrain.flush()
+    if world.transition_log is not None:
+        world.transition_log.close()
+    if args.shards is not None:
+        world.close()
+    world.fleet.brains[0].close()
+    world.fleet.brains[0].save()
+
+if __name__ == '__main__':
+    main()
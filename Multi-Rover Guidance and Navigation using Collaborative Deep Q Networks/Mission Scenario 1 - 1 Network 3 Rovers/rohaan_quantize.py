@@ -0,0 +1,147 @@
+# Quantized rover policy of Mission Scenario 1
+# Converts a saved rover network (Network) into an int8 TorchScript model for small on-board CPUs,
+# calibrated on logged sensor signals, and compares its actions, latency and size with the float network
+
+# Importing the libraries
+import argparse
+import copy
+import glob
+import io
+import json
+import warnings
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.ao.quantization as quantization
+
+from rohaan_ai import Network, Hidden_Layer_Size
+from rohaan_bench import timeit
+from rohaan_transitions import TransitionDataset
+
+Calibration_States = 10000  # Logged states observed to choose the scales of the activations
+Evaluation_States = 10000   # Other states on which the actions of both networks are compared
+Batch_Sizes = [1, 64]       # One rover, and many policies or rovers per call
+
+# The rover network between quantize and dequantize stubs, as eager mode static quantization needs
+
+class QuantizablePolicy(nn.Module):
+
+    def __init__(self, network):
+        super(QuantizablePolicy, self).__init__()
+        self.quant = quantization.QuantStub()
+        self.fc1 = copy.deepcopy(network.fc1)
+        self.relu = nn.ReLU()
+        self.fc2 = copy.deepcopy(network.fc2)
+        self.dequant = quantization.DeQuantStub()
+
+    def forward(self, state):
+        return self.dequant(self.fc2(self.relu(self.fc1(self.quant(state)))))
+
+def load_network(path):     # Rover network of a checkpoint: a brain saved by the viewer or rohaan_pretrain.py, or a bare state dict
+    checkpoint = torch.load(path)
+    state_dict = checkpoint.get('state_dict', checkpoint)
+    network = Network(input_size = state_dict['fc1.weight'].shape[1], nb_action = state_dict['fc2.weight'].shape[0])
+    if state_dict['fc1.weight'].shape[0] != Hidden_Layer_Size:
+        raise ValueError(path + ' has a hidden layer of another size')
+    network.load_state_dict(state_dict)
+    return network.eval()
+
+def quantize_dynamic(network):  # int8 weights, activations quantized on the fly: needs no calibration
+    return quantization.quantize_dynamic(network, {nn.Linear}, dtype = torch.qint8)
+
+def quantize_static(network, calibration_states, engine):   # int8 weights and activations, with the scales observed on calibration_states
+    policy = QuantizablePolicy(network).eval()
+    policy.qconfig = quantization.get_default_qconfig(engine)
+    policy = quantization.fuse_modules(policy, [['fc1', 'relu']])
+    quantization.prepare(policy, inplace = True)
+    with torch.inference_mode():
+        policy(calibration_states)
+    return quantization.convert(policy, inplace = True)
+
+def synthetic_states(n, input_size, rng):   # Without logs: signals in [0, 1], then the orientation and its opposite
+    orientation = rng.uniform(-1, 1, size = (n, 1))
+    return torch.from_numpy(np.hstack([rng.uniform(0, 1, size = (n, input_size - 2)), orientation, -orientation]).astype(np.float32))
+
+def agreement(network, quantized, states):  # Share of the states on which both networks prefer the same action
+    with torch.inference_mode():
+        return (network(states).argmax(1) == quantized(states).argmax(1)).float().mean().item()
+
+def traced(network, input_size):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return torch.jit.trace(network, torch.zeros(1, input_size), check_trace = False)
+
+def weight_bytes(value):    # Size of the weights and biases of a network, whose packed int8 layers hold theirs in tuples
+    if isinstance(value, nn.Module):
+        value = tuple(value.state_dict().values())
+    if isinstance(value, tuple):
+        return sum(weight_bytes(v) for v in value)
+    return value.numel() * value.element_size() if torch.is_tensor(value) else 0
+
+def model_bytes(script):    # Size of a TorchScript model as deployed, code included
+    buffer = io.BytesIO()
+    torch.jit.save(script, buffer)
+    return len(buffer.getvalue())
+
+def compare(scripts, states, repeats):  # Latency in microseconds of each model per batch size, and its size
+    results = {}
+    for name, script in scripts.items():
+        results[name] = {'bytes': model_bytes(script), 'latency_us': {}}
+        for batch_size in Batch_Sizes:
+            batch = states[:batch_size]
+            with torch.inference_mode():
+                results[name]['latency_us'][str(batch_size)] = timeit(lambda: script(batch), repeats)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Export the rover network of Mission Scenario 1 as an int8 TorchScript model.')
+    parser.add_argument('--checkpoint', default = 'last_brain.pth', help = 'saved rover network')
+    parser.add_argument('--output', default = None, help = 'int8 TorchScript model, by default the checkpoint with .int8.pt appended')
+    parser.add_argument('--mode', choices = ['static', 'dynamic'], default = 'static', help = 'quantize the activations with calibrated (static) or per-call (dynamic) scales')
+    parser.add_argument('--logs', nargs = '*', default = [], help = 'transition logs whose states calibrate and evaluate the model, e.g. transitions/*.log')
+    parser.add_argument('--engine', default = torch.backends.quantized.engine, choices = torch.backends.quantized.supported_engines, help = 'quantized kernels: x86 or fbgemm on a PC, qnnpack on ARM')
+    parser.add_argument('--threads', type = int, default = 1, help = 'threads of the latency comparison, one for one core of a rover')
+    parser.add_argument('--repeats', type = int, default = 1000, help = 'timed calls per latency')
+    parser.add_argument('--seed', type = int, default = 0, help = 'seed of the states drawn')
+    parser.add_argument('--results', default = None, help = 'JSON file receiving the comparison')
+    args = parser.parse_args()
+
+    network = load_network(args.checkpoint)
+    rng = np.random.default_rng(args.seed)
+    paths = sorted(set(path for pattern in args.logs for path in (glob.glob(pattern) or [pattern])))
+    if paths:
+        dataset = TransitionDataset(paths)
+        calibration_states = torch.from_numpy(dataset.sample(Calibration_States, rng)[0])
+        evaluation_states = torch.from_numpy(dataset.sample(Evaluation_States, rng)[0])
+    else:
+        print('No transition logs: calibrating and evaluating on synthetic states')
+        calibration_states = synthetic_states(Calibration_States, network.input_size, rng)
+        evaluation_states = synthetic_states(Evaluation_States, network.input_size, rng)
+    evaluation_states = evaluation_states[torch.from_numpy(rng.permutation(len(evaluation_states)))]   # Sampled states are sorted by log position
+    torch.backends.quantized.engine = args.engine
+    if args.mode == 'static':
+        quantized = quantize_static(network, calibration_states, args.engine)
+    else:
+        quantized = quantize_dynamic(network)
+    script = traced(quantized, network.input_size)
+    output = args.output if args.output is not None else args.checkpoint + '.int8.pt'
+    torch.jit.save(script, output)
+
+    torch.set_num_threads(args.threads)
+    results = {'checkpoint': args.checkpoint, 'output': output, 'mode': args.mode, 'engine': args.engine, 'threads': args.threads,
+               'logged_states': bool(paths), 'action_agreement': agreement(network, torch.jit.load(output), evaluation_states)}
+    results.update(compare({'float': traced(network, network.input_size), 'int8': script}, evaluation_states, args.repeats))
+    results['float']['weight_bytes'] = weight_bytes(network)
+    results['int8']['weight_bytes'] = weight_bytes(quantized)
+    print('Action agreement with the float network: {0:.2%} of {1} states'.format(results['action_agreement'], len(evaluation_states)))
+    print('{0:>6} {1:>10} {2:>10} {3}'.format('model', 'weights', 'file', ' '.join('{0:>12}'.format('batch ' + str(b)) for b in Batch_Sizes)))
+    for name in ('float', 'int8'):
+        print('{0:>6} {1:>9}B {2:>9}B {3}'.format(name, results[name]['weight_bytes'], results[name]['bytes'],
+            ' '.join('{0:>10.1f}us'.format(results[name]['latency_us'][str(b)]) for b in Batch_Sizes)))
+    if args.results is not None:
+        with open(args.results, 'w') as f:
+            json.dump(results, f, indent = 2, sort_keys = True)
+
+if __name__ == '__main__':
+    main()
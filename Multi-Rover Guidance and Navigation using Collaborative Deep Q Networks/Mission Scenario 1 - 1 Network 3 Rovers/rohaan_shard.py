@@ -0,0 +1,195 @@
+# Rover Sharded World
+# The rover world with its map cut into vertical strips, each owned by a worker process which moves, senses and collides
+# the rovers inside it. The rovers and the sand map live in memory shared by every process: a rover crossing into
+# another strip is handed over by its position alone, and the sensors and collision tests of a strip read the cells
+# and rovers of its neighbours (its halo) in place. The brains, goals and scores stay with the world, in this process.
+
+# Importing the libraries
+import multiprocessing
+import numpy as np
+
+from rohaan_terrain import SharedTerrain
+from rohaan_world import (RoverWorld, SpatialHash, Car_Speed, Sand_Speed, Map_Margin, Proximity_To_Goal,
+                          action2rotation, Reward_Names)
+
+Default_Shards = multiprocessing.cpu_count()    # One strip per core
+Alignment = 64                                  # Bytes between the starts of two shared arrays: one cache line
+Fleet_Fields = ['x', 'y', 'angle', 'velocity', 'sensors', 'signals', 'goal_x', 'goal_y',
+                'last_distance', 'last_reward', 'goals_achieved', 'last_goal']   # Arrays of the fleet moved to shared memory
+
+# Shared memory: one block holding every array, described by a layout of (name, shape, dtype)
+
+def aligned(nbytes):
+    return -(-nbytes // Alignment) * Alignment
+
+def block_size(layout):
+    return sum(aligned(int(np.prod(shape)) * np.dtype(dtype).itemsize) for name, shape, dtype in layout)
+
+def views(buffer, layout):  # Arrays of the layout over a shared block, in every process
+    arrays = {}
+    offset = 0
+    for name, shape, dtype in layout:
+        count = int(np.prod(shape))
+        arrays[name] = np.frombuffer(buffer, dtype = dtype, count = count, offset = offset).reshape(shape)
+        offset += aligned(count * np.dtype(dtype).itemsize)
+    return arrays
+
+def strips(bounds, x):   # Strip of each position x
+    return np.searchsorted(bounds[1:-1], x, side = 'right')
+
+# Strip of the map owned by one worker: the same rules as RoverWorld.step_fleet and RoverWorld.collide, for its rovers only
+
+class Shard(object):
+
+    sand_density = RoverWorld.sand_density  # The sensors read the shared map exactly as the world does
+    is_sand = RoverWorld.is_sand
+
+    def __init__(self, arrays, index, bounds, collision_radius, sensor_array):
+        self.arrays = arrays
+        self.index = index                  # Strip [bounds[index], bounds[index + 1]) of x
+        self.bounds = bounds                # Edges of the strips, the outer ones infinite
+        self.collision_radius = collision_radius
+        self.sensor_array = sensor_array
+        self.terrain = SharedTerrain(arrays['cells'], arrays['sat'])
+        self.width = self.terrain.width
+        self.height = self.terrain.height
+        self.rewards = dict((name, arrays['reward_' + name]) for name in Reward_Names)
+        self.spatial_hash = SpatialHash(collision_radius)
+
+    def owners(self):   # Strip of every rover, from its position: crossing an edge hands a rover over to the next worker
+        return strips(self.bounds, self.arrays['x'])
+
+    def move(self):     # Moves, senses and rewards the rovers of the strip; flags those reaching their goals
+        a = self.arrays
+        rewards = self.rewards
+        own = np.flatnonzero(a['owner'] == self.index)   # Owners set before the phase: the positions change while the strips move their rovers
+        a['reached'][own] = False
+        if len(own) == 0:
+            return
+        velocity = a['velocity'][own]
+        x = a['x'][own] + velocity[:, 0]
+        y = a['y'][own] + velocity[:, 1]
+        angle = a['angle'][own] + action2rotation[a['actions'][own]]
+        sample_x, sample_y = self.sensor_array.samples(x, y, angle)
+        a['sensors'][own, :, 0] = sample_x[:, :, -1]
+        a['sensors'][own, :, 1] = sample_y[:, :, -1]
+        a['signals'][own] = self.sand_density(sample_x, sample_y).mean(axis = 2)  # The windows near an edge read the cells of the next strip
+        distance = np.sqrt((x - a['goal_x'][own])**2 + (y - a['goal_y'][own])**2)
+
+        on_sand = self.is_sand(x, y)
+        speed = np.where(on_sand, Sand_Speed, Car_Speed)
+        radians = np.radians(angle)
+        a['velocity'][own, 0] = speed * np.cos(radians)
+        a['velocity'][own, 1] = speed * np.sin(radians)
+        reward = np.where(on_sand, rewards['sand'][own], rewards['living'][own] + rewards['closer'][own] * (distance < a['last_distance'][own]))
+
+        on_wall = ((x < Map_Margin) | (x > self.width - Map_Margin) |
+                   (y < Map_Margin) | (y > self.height - Map_Margin))
+        a['x'][own] = np.minimum(np.maximum(x, Map_Margin), self.width - Map_Margin)
+        a['y'][own] = np.minimum(np.maximum(y, Map_Margin), self.height - Map_Margin)
+        a['angle'][own] = angle
+        reward[on_wall] = rewards['wall'][own][on_wall]
+        a['last_reward'][own] = reward
+        a['reached'][own] = distance < Proximity_To_Goal
+        a['last_distance'][own] = distance
+
+    def collide(self):  # Positions are only read in this phase. Flags the rovers of the strip colliding with any rover, and counts the pairs whose first rover it owns
+        a = self.arrays
+        x = a['x']
+        mine = self.owners() == self.index
+        a['colliding'][mine] = False
+        a['collision_counts'][self.index] = 0
+        r = self.collision_radius
+        halo = np.flatnonzero((x >= self.bounds[self.index] - r) & (x < self.bounds[self.index + 1] + r))   # Its rovers, and those of its neighbours close enough to hit them
+        self.spatial_hash.build(x[halo], a['y'][halo])
+        first, second = self.spatial_hash.pairs(r)
+        first = halo[first]
+        second = halo[second]
+        a['collision_counts'][self.index] = mine[np.minimum(first, second)].sum()    # A pair seen by two strips is counted once
+        a['colliding'][first[mine[first]]] = True
+        a['colliding'][second[mine[second]]] = True
+
+def run_shard(conn, buffer, layout, index, bounds, collision_radius, sensor_array):
+    shard = Shard(views(buffer, layout), index, bounds, collision_radius, sensor_array)
+    while True:
+        command = conn.recv()
+        if command == 'move':
+            shard.move()
+        elif command == 'collide':
+            shard.collide()
+        elif command == 'stop':
+            break
+        conn.send(None)
+    conn.close()
+
+# The world, whose step_fleet and collide phases run in the workers; every other phase of a step is unchanged
+
+class ShardedWorld(RoverWorld):
+
+    def __init__(self, width, height, fleet, collision_radius, score_period, shards = Default_Shards, **options):
+        # options: those of RoverWorld but the terrain, the sand map being a dense map in shared memory
+        n = len(fleet)
+        self.layout = ([(name, getattr(fleet, name).shape, getattr(fleet, name).dtype) for name in Fleet_Fields] +
+                       [('reward_' + name, (n,), fleet.rewards[name].dtype) for name in Reward_Names] +
+                       [('actions', (n,), np.int64), ('owner', (n,), np.int64), ('reached', (n,), np.bool_), ('colliding', (n,), np.bool_),
+                        ('collision_counts', (shards,), np.int64),
+                        ('cells', (width, height), np.uint8), ('sat', (width + 1, height + 1), np.int32)])
+        context = multiprocessing.get_context('spawn')
+        self.buffer = context.RawArray('b', block_size(self.layout))
+        self.shared = views(self.buffer, self.layout)
+        for name in Fleet_Fields:   # The fleet keeps its arrays, now views of the shared block
+            self.shared[name][:] = getattr(fleet, name)
+            setattr(fleet, name, self.shared[name])
+        for name in Reward_Names:
+            self.shared['reward_' + name][:] = fleet.rewards[name]
+            fleet.rewards[name] = self.shared['reward_' + name]
+        super(ShardedWorld, self).__init__(width, height, fleet, collision_radius, score_period,
+                                           terrain = SharedTerrain(self.shared['cells'], self.shared['sat']), **options)
+        self.bounds = bounds = np.linspace(0, width, shards + 1)
+        bounds[0] = -np.inf     # The outer strips also own the rovers pushed past the edges
+        bounds[-1] = np.inf
+        self.connections = []
+        self.workers = []
+        for k in range(shards):
+            conn, worker_conn = context.Pipe()
+            worker = context.Process(target = run_shard, args = (worker_conn, self.buffer, self.layout, k, bounds, collision_radius, fleet.sensor_array), daemon = True)
+            worker.start()
+            self.connections.append(conn)
+            self.workers.append(worker)
+
+    def run(self, command):     # One phase in every strip at once; returns when all are done
+        for conn in self.connections:
+            conn.send(command)
+        for conn in self.connections:
+            conn.recv()
+
+    def step_fleet(self, actions):  # The goals reached get new ones here, drawn in the same order as by RoverWorld
+        self.shared['actions'][:] = actions
+        self.shared['owner'][:] = strips(self.bounds, self.fleet.x)
+        self.run('move')
+        reached = np.flatnonzero(self.shared['reached'])
+        if len(reached):
+            self.reach_goals(reached)
+
+    def collide(self):
+        self.run('collide')
+        colliding = np.flatnonzero(self.shared['colliding'])
+        if len(colliding) == 0:
+            return
+        fleet = self.fleet
+        fleet.x[colliding] = 1  # Slow down
+        fleet.last_reward[colliding] = fleet.rewards['collision'][colliding]   # Large penalty
+        pairs = int(self.shared['collision_counts'].sum())
+        self.total_collisions += pairs
+        if self.verbose:
+            print('COLLISION!\n' * pairs, end = '')
+
+    def neighbours(self, x, y, radius):     # The hash of every rover is only built when asked for, the strips hashing their own
+        self.spatial_hash.build(self.fleet.x, self.fleet.y)
+        return self.spatial_hash.within(x, y, radius)
+
+    def close(self):    # Stops the workers
+        for conn in self.connections:
+            conn.send('stop')
+        for worker in self.workers:
+            worker.join()
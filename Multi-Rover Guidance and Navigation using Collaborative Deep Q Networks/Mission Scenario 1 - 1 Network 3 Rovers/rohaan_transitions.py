@@ -0,0 +1,110 @@
+# Rover Transitions
+# Experience of the rovers streamed to append-only binary logs of fixed-size records, one per rover and timestep,
+# which are read back as memory-mapped arrays, e.g. to pre-train a network offline
+
+# Importing the libraries
+import os
+import numpy as np
+
+Log_Magic = b'ROVERLOG'     # First bytes of a log, followed by the version and the size of a state
+Log_Version = 1
+Header_Size = 16
+Write_Buffer = 1 << 20      # Bytes buffered before a write to the file
+
+def record_dtype(state_size):   # One transition of one rover, packed: 6 + 8 * state_size + 5 bytes
+    return np.dtype([('timestep', np.uint32), ('rover', np.uint16), ('state', np.float32, (state_size,)),
+                     ('action', np.int8), ('reward', np.float32), ('next_state', np.float32, (state_size,))])
+
+def read_header(path):  # Size of a state of the log at path
+    with open(path, 'rb') as f:
+        header = f.read(Header_Size)
+    if len(header) != Header_Size or not header.startswith(Log_Magic):
+        raise ValueError(path + ' is not a rover transition log')
+    version, state_size = np.frombuffer(header[len(Log_Magic):], dtype = np.uint32).tolist()
+    if version != Log_Version:
+        raise ValueError(path + ' is a log of version ' + str(version))
+    return state_size
+
+def open_log(path):     # Records of the log at path, memory-mapped read-only; a partial last record (interrupted write) is ignored
+    dtype = record_dtype(read_header(path))
+    n = (os.path.getsize(path) - Header_Size) // dtype.itemsize
+    if n == 0:
+        return np.zeros(0, dtype = dtype)
+    return np.memmap(path, dtype = dtype, mode = 'r', offset = Header_Size, shape = (n,))
+
+# Writer of a log: append() only copies the transitions of a timestep into a buffer of records
+
+class TransitionLog(object):
+
+    def __init__(self, path, state_size, buffer_size = Write_Buffer):
+        self.path = path
+        self.state_size = state_size
+        self.dtype = record_dtype(state_size)
+        self.count = 0                  # Records appended by this writer
+        if os.path.exists(path) and os.path.getsize(path) > 0:     # Appends to a previous session
+            if read_header(path) != state_size:
+                raise ValueError(path + ' holds states of another size')
+            self.file = open(path, 'r+b')
+            n = (os.path.getsize(path) - Header_Size) // self.dtype.itemsize
+            self.file.truncate(Header_Size + n * self.dtype.itemsize)    # Drops a partial last record
+            self.file.seek(0, os.SEEK_END)
+        else:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok = True)
+            self.file = open(path, 'wb')
+            self.file.write(Log_Magic + np.array([Log_Version, state_size], dtype = np.uint32).tobytes())
+        self.buffer = np.zeros(max(buffer_size // self.dtype.itemsize, 1), dtype = self.dtype)
+        self.buffered = 0
+
+    def append(self, timestep, state, action, reward, next_state):  # Transitions of every rover: arrays of one row per rover
+        n = len(action)
+        if self.buffered + n > len(self.buffer):
+            self.flush()
+        if n > len(self.buffer):
+            self.buffer = np.zeros(n, dtype = self.dtype)
+        records = self.buffer[self.buffered:self.buffered + n]
+        records['timestep'] = timestep
+        records['rover'] = np.arange(n)
+        records['state'] = state
+        records['action'] = action
+        records['reward'] = reward
+        records['next_state'] = next_state
+        self.buffered += n
+        self.count += n
+
+    def flush(self):
+        if self.buffered:
+            self.file.write(self.buffer[:self.buffered].tobytes())
+            self.buffered = 0
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+# Records of several logs, sampled without loading them in memory
+
+class TransitionDataset(object):
+
+    def __init__(self, paths):
+        self.logs = [log for log in (open_log(path) for path in paths) if len(log)]
+        if not self.logs:
+            raise ValueError('no transitions in ' + ', '.join(paths))
+        sizes = set(log.dtype['state'].shape[0] for log in self.logs)
+        if len(sizes) > 1:
+            raise ValueError('logs with states of different sizes: ' + str(sorted(sizes)))
+        self.state_size = sizes.pop()
+        self.ends = np.cumsum([len(log) for log in self.logs])     # Index past the last record of each log
+
+    def __len__(self):
+        return int(self.ends[-1])
+
+    def sample(self, batch_size, rng):  # (states, next states, actions, rewards) of batch_size records drawn with replacement
+        index = np.sort(rng.integers(len(self), size = batch_size))     # Sorted, the reads of each log go forward
+        which = np.searchsorted(self.ends, index, side = 'right')
+        starts = self.ends - [len(log) for log in self.logs]
+        parts = [self.logs[k][index[which == k] - starts[k]] for k in np.unique(which).tolist()]
+        records = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        return (np.ascontiguousarray(records['state']), np.ascontiguousarray(records['next_state']),   # Fields of packed records are strided
+                records['action'].astype(np.int64), np.ascontiguousarray(records['reward']))
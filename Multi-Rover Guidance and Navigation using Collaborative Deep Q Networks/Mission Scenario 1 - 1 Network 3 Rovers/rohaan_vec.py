@@ -0,0 +1,157 @@
+# Rover Vectorized Environment
+# E independent rover worlds stepped in lockstep: every quantity is an (E, R) array for R rovers per world,
+# and the sand maps an (E, W, H) stack, so that one batched forward pass of a network acts in every world
+
+# Importing the libraries
+import numpy as np
+
+from rohaan_terrain import TerrainStack
+from rohaan_world import (SensorArray, SpatialHash, Car_Speed, Sand_Speed, Sensor_Half_Width, Map_Margin,
+                          Proximity_To_Goal, action2rotation, Reward_Names)
+
+# Same rules as RoverWorld.step, without the brains: the actions come in and the observations and rewards go out
+
+class RoverVecEnv(object):
+
+    def __init__(self, n_worlds, width, height, positions, velocities, rewards, collision_radius, sensor_array = None, seed = None):
+        self.n_worlds = n_worlds
+        self.width = width
+        self.height = height
+        self.start_positions = np.asarray(positions, dtype = float).reshape(-1, 2)     # Start of each rover, the same in every world
+        self.start_velocities = np.asarray(velocities, dtype = float).reshape(-1, 2)
+        self.n_rovers = len(self.start_positions)
+        self.sensor_array = sensor_array if sensor_array is not None else SensorArray()
+        self.collision_radius = collision_radius
+        self.terrain = TerrainStack(n_worlds, width, height)   # Sand map of each world
+        self.world_index = np.repeat(np.arange(n_worlds), self.n_rovers)    # World of each rover, rovers stored world after world
+        self.spatial_hash = SpatialHash(collision_radius)
+        self.world_stride = width + 2 * collision_radius    # Worlds are hashed side by side, too far apart for their rovers to collide
+        self.rewards = {}                   # Reward coefficients, an (E, R) array per name of Reward_Names
+        for name in Reward_Names:
+            self.rewards[name] = np.zeros((n_worlds, self.n_rovers))
+            self.rewards[name][:] = rewards.get(name, 0)   # A scalar, one value per rover, or one per rover of each world
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):    # Every rover back to its start, with new goals; returns the observations (E, R, sensors + 2)
+        n = self.n_worlds * self.n_rovers
+        self.x = np.tile(self.start_positions[:, 0], self.n_worlds)    # Rover quantities, flat arrays of length E * R
+        self.y = np.tile(self.start_positions[:, 1], self.n_worlds)
+        self.velocity = np.tile(self.start_velocities, (self.n_worlds, 1))
+        self.angle = np.zeros(n)
+        self.signals = np.zeros((n, len(self.sensor_array)))
+        self.last_distance = np.zeros(n)
+        self.last_reward = np.zeros(n)
+        self.goal_x, self.goal_y = self.random_goals(n)
+        self.timestep = 0
+        self.goals_achieved = np.zeros((self.n_worlds, self.n_rovers), dtype = int)
+        self.collisions = np.zeros(self.n_worlds, dtype = int)
+        return self.observe()
+
+    def random_goals(self, n):
+        return (self.rng.integers(Map_Margin, self.width - Map_Margin, size = n, endpoint = True).astype(float),
+                self.rng.integers(Map_Margin, self.height - Map_Margin, size = n, endpoint = True).astype(float))
+
+    def flat_rewards(self, name):
+        return self.rewards[name].ravel()
+
+    # Sand maps
+
+    def fill_sand(self, x0, x1, y0, y1, value, world = None):  # Sets the sand of the rectangle [x0, x1) x [y0, y1) of one world, or of all of them
+        x0 = min(max(x0, 0), self.width)
+        x1 = min(max(x1, x0), self.width)
+        y0 = min(max(y0, 0), self.height)
+        y1 = min(max(y1, y0), self.height)
+        self.terrain.fill(world, x0, x1, y0, y1, value)
+
+    def load_sand(self, cells, world = None):  # Sand of every cell of one world, or of all of them
+        if np.shape(cells) != (self.width, self.height):
+            raise ValueError('a map of {0}x{1} cells does not fit worlds of {2}x{3}'.format(np.shape(cells)[0], np.shape(cells)[1], self.width, self.height))
+        self.terrain.load(world, cells)
+
+    def sand_density(self, index, x, y):    # Density of sand in the window around each point (x, y) of the worlds in index
+        inside_x = np.minimum(np.maximum(x, Map_Margin), self.width - Map_Margin)
+        inside_y = np.minimum(np.maximum(y, Map_Margin), self.height - Map_Margin)
+        outside = (inside_x != x) | (inside_y != y)
+        x = inside_x.astype(int)
+        y = inside_y.astype(int)
+        w = Sensor_Half_Width
+        density = self.terrain.rect_sums(index, x - w, x + w, y - w, y + w) / (4. * w * w)
+        return np.where(outside, 1., density)
+
+    def is_sand(self, x, y):
+        x = np.minimum(np.maximum(x.astype(int), 0), self.width - 1)
+        y = np.minimum(np.maximum(y.astype(int), 0), self.height - 1)
+        return self.terrain.values(self.world_index, x, y) > 0
+
+    # Rovers
+
+    def observe(self):
+        xx = self.goal_x - self.x
+        yy = self.goal_y - self.y
+        vx = self.velocity[:, 0]
+        vy = self.velocity[:, 1]
+        orientation = -np.arctan2(vx * yy - vy * xx, vx * xx + vy * yy) / np.pi
+        return np.column_stack([self.signals, orientation, -orientation]).reshape(self.n_worlds, self.n_rovers, -1)
+
+    def step(self, actions):    # One timestep of every world; returns the observations (E, R, sensors + 2) and rewards (E, R)
+        self.timestep += 1
+        self.x += self.velocity[:, 0]
+        self.y += self.velocity[:, 1]
+        self.angle += action2rotation[np.asarray(actions).ravel()]
+        sample_x, sample_y = self.sensor_array.samples(self.x, self.y, self.angle)
+        self.signals = self.sand_density(self.world_index[:, None, None], sample_x, sample_y).mean(axis = 2)
+        distance = np.sqrt((self.x - self.goal_x)**2 + (self.y - self.goal_y)**2)
+
+        on_sand = self.is_sand(self.x, self.y)
+        speed = np.where(on_sand, Sand_Speed, Car_Speed)
+        angle = np.radians(self.angle)
+        self.velocity[:, 0] = speed * np.cos(angle)
+        self.velocity[:, 1] = speed * np.sin(angle)
+        self.last_reward = np.where(on_sand, self.flat_rewards('sand'), self.flat_rewards('living') + self.flat_rewards('closer') * (distance < self.last_distance))
+
+        on_wall = ((self.x < Map_Margin) | (self.x > self.width - Map_Margin) |
+                   (self.y < Map_Margin) | (self.y > self.height - Map_Margin))
+        np.minimum(np.maximum(self.x, Map_Margin, out = self.x), self.width - Map_Margin, out = self.x)
+        np.minimum(np.maximum(self.y, Map_Margin, out = self.y), self.height - Map_Margin, out = self.y)
+        self.last_reward[on_wall] = self.flat_rewards('wall')[on_wall]
+
+        reached = np.flatnonzero(distance < Proximity_To_Goal)
+        if len(reached):
+            self.goal_x[reached], self.goal_y[reached] = self.random_goals(len(reached))
+            self.goals_achieved.ravel()[reached] += 1
+            self.last_reward[reached] = self.flat_rewards('goal')[reached]
+        self.last_distance = distance
+        self.collide()
+        return self.observe(), self.last_reward.reshape(self.n_worlds, self.n_rovers)
+
+    def collide(self):  # Rovers of the same world only: a world is offset from the last by more than its width
+        self.spatial_hash.build(self.x + self.world_index * self.world_stride, self.y)
+        first, second = self.spatial_hash.pairs(self.collision_radius)
+        if len(first) == 0:
+            return
+        colliding = np.union1d(first, second)
+        self.x[colliding] = 1
+        self.last_reward[colliding] = self.flat_rewards('collision')[colliding]
+        np.add.at(self.collisions, self.world_index[first], 1)
+
+# Acting in every world: rovers driven by the same brain act in one batch, whatever their world
+
+def brain_groups(brains):   # (brain, indices of the rovers it drives) of a list of one brain per rover of a world
+    groups = []
+    for r, brain in enumerate(brains):
+        for group_brain, indices in groups:
+            if group_brain is brain:
+                indices.append(r)
+                break
+        else:
+            groups.append((brain, [r]))
+    return [(brain, np.array(indices)) for brain, indices in groups]
+
+def act(groups, rewards, observations):     # Actions (E, R) of every rover: one update_batch() call per brain, which learns from the last rewards
+    actions = np.zeros(observations.shape[:2], dtype = int)
+    for brain, indices in groups:
+        signals = observations[:, indices]
+        actions[:, indices] = np.reshape(brain.update_batch(rewards[:, indices].ravel().tolist(),
+                                                            signals.reshape(-1, signals.shape[-1]).tolist()), (-1, len(indices)))
+    return actions
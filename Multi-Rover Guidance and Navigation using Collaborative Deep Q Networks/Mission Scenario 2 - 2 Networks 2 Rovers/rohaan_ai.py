@@ -6,12 +6,15 @@
 import numpy as np
 import random
 import os # To save and load model
+import copy
+import queue
+import threading
+import warnings
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import torch.optim as optim
 import torch.autograd as autograd
-from torch.autograd import Variable
 
 Temperature = 7
 Hidden_Layer_Size = 100
@@ -20,13 +23,71 @@ Reward_Window_Size = 100
 Learning_Rate = 0.01
 Learning_Rate2 = 0.0001
 Capacity = 100000
+Sync_Period = 10 # Background learning updates between two refreshes of the policy used to act
+Checkpoint_Versions = 3 # Versions of a checkpoint file kept on disk: path, path.1, path.2
+Pretrained_Path = 'pretrained_rover_ai_network' # Rover network trained offline by rohaan_pretrain.py, loaded with the load button
+
+# Checkpoint Manager Class: keeps the best model in memory and writes its versions to disk in a background thread
+
+class CheckpointManager(object):
+    
+    def __init__(self, path, versions = Checkpoint_Versions):
+        self.path = path                    # Latest version; the older ones are path.1, path.2, ...
+        self.versions = versions
+        self.best = None                    # In-memory snapshot of the best model
+        self.best_score = 0
+        self.pending = queue.Queue()        # Snapshots waiting to be written
+        self.writer = None                  # Writer thread, started at the first save
+        
+    def snapshot(self, model, optimizer, score):  # Deep copy of the weights and of the optimizer state, which training no longer changes
+        return {'state_dict': copy.deepcopy(model.state_dict()),
+                'optimizer': copy.deepcopy(optimizer.state_dict()),
+                'score': float(score)}
+    
+    def save_best(self, score, model, optimizer):
+        self.best = self.snapshot(model, optimizer, score)
+        self.best_score = score
+        self.save(self.best)
+        
+    def restore_best(self, model, optimizer):   # From memory, without touching the disk
+        model.load_state_dict(self.best['state_dict'])
+        optimizer.load_state_dict(copy.deepcopy(self.best['optimizer']))  # The optimizer may keep the tensors it is given
+        
+    def save(self, snapshot):   # Returns at once: the snapshot is written by the writer thread
+        if self.writer is None:
+            self.writer = threading.Thread(target = self.run, daemon = True)
+            self.writer.start()
+        self.pending.put(snapshot)
+        
+    def run(self):
+        while True:
+            snapshot = self.pending.get()
+            if snapshot is None:
+                return
+            self.write(snapshot)
+            
+    def version_path(self, k):
+        return self.path if k == 0 else self.path + '.' + str(k)
+    
+    def write(self, snapshot):  # Atomic: readers see either the previous version or the new one, never a partial file
+        temp_path = self.path + '.tmp'
+        torch.save(snapshot, temp_path)
+        for k in range(self.versions - 1, 0, -1):   # path.1 -> path.2, path -> path.1, ...
+            if os.path.exists(self.version_path(k - 1)):
+                os.replace(self.version_path(k - 1), self.version_path(k))
+        os.replace(temp_path, self.path)
+        
+    def close(self):    # Waits for the pending snapshots to be written
+        if self.writer is not None:
+            self.pending.put(None)
+            self.writer.join()
+            self.writer = None
 
 # Class defining Architecture of the Car Neural Network
 
 class Car_Network(nn.Module):
     
-    best_score = 0
-    best_network_config = 0
+    checkpoints = CheckpointManager('best_rover_ai_network')   # Best rover network, shared by every rover
     
     def __init__(self, input_size, nb_action):
         super(Car_Network, self).__init__()
@@ -40,6 +101,23 @@ class Car_Network(nn.Module):
         q_values = self.fc2(x)          # Activating Output layer neurons
         return q_values
 
+# Acting Class: the network, the temperature and the draw of an action fused in one traced graph, run without autograd
+
+class Actor(nn.Module):
+    
+    def __init__(self, network):
+        super(Actor, self).__init__()
+        self.network = network
+        
+    def forward(self, state, noise):    # Gumbel-max: the argmax of Q * Temperature plus Gumbel noise -log(E), E ~ Exp(1), is a draw of softmax(Q * Temperature)
+        return torch.argmax(self.network(state) * Temperature - noise.exponential_().log_(), dim = 1)
+
+def trace_actor(network):   # The traced graph shares the parameters of the network, so it is traced once per network, not once per update
+    example = (torch.zeros(1, network.input_size), torch.empty(1, network.nb_action))
+    with warnings.catch_warnings():     # Tracing is deprecated in recent torch, but still the fastest acting path
+        warnings.simplefilter('ignore')
+        return torch.jit.trace(Actor(network), example, check_trace = False)
+
 # Class defining Architecture of the Car Neural Network
 
 class Cluser_Network(nn.Module):
@@ -56,8 +134,6 @@ class Cluser_Network(nn.Module):
                             nn.Linear(in_features = int(0.25 * Hidden_Layer_Size), out_features = nb_action)
                             )
         
-        self.best_network_config = self.q_network.state_dict()
-        
     def forward(self, state):           # State is the current state vector: 3 signals, Orientation, and Negative Orientation
         return self.q_network(state)
     
@@ -67,54 +143,141 @@ class ReplayMemory(object):
     
     def __init__(self, capacity):
         self.capacity = capacity    # Maximum states saved in memory at a time
-        self.memory = []            # Empty list of previous states
+        self.memory = None          # Preallocated tensors, one per element of an event, allocated at the first push
+        self.position = 0           # Index where the next event is written (ring buffer)
+        self.size = 0               # Number of events saved in memory
+        
+    def __len__(self):
+        return self.size
         
     def push(self, event):  # Function to save event to memory
-        self.memory.append(event)   # Event: Current State, Last State, Last Action, Last Reward
-        if len(self.memory) > self.capacity:
-            del self.memory[0]      # delete oldest state in memory
+        if self.memory is None:     # Event: Current State, Last State, Last Action, Last Reward, each of batch size 1
+            self.memory = [torch.zeros((self.capacity,) + tuple(x.shape[1:]), dtype = x.dtype) for x in event]
+        for buffer, x in zip(self.memory, event):
+            buffer[self.position] = x[0]    # overwrites the oldest state in memory once full
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        
+    def push_batch(self, events):   # Function to save N events to memory at once, each element with a leading dimension N
+        if self.memory is None:
+            self.memory = [torch.zeros((self.capacity,) + tuple(x.shape[1:]), dtype = x.dtype) for x in events]
+        n = events[0].shape[0]
+        indices = (self.position + torch.arange(n)) % self.capacity
+        for buffer, x in zip(self.memory, events):
+            buffer[indices] = x
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
             
     def sample(self, batch_size):   # Random Sampling function
-        samples = random.sample(self.memory, batch_size) # Randomly sample memory for batch_size elements
-        # samples_copy = samples
+        indices = torch.tensor(random.sample(range(self.size), batch_size))     # Randomly sample memory for batch_size elements
+        return [buffer.index_select(0, indices) for buffer in self.memory]      # One batch tensor per element of an event
             
-        # print('---samples copy orig---')
-        # print(list(samples_copy))
-        
-        samples = zip(*samples)
-        samples = map(lambda x: Variable(torch.cat(x, 0)), samples)
+# Learner Class: runs learn() in a background thread, on batches drained from the replay memory of an agent
+
+class Learner(object):
+    
+    def __init__(self, agent, updates_per_step):
+        self.agent = agent                          # Agent whose memory is sampled and whose model is trained
+        self.updates_per_step = updates_per_step    # learn() calls per update() call of the agent
+        self.condition = threading.Condition()      # Guards the replay memory, shared with the acting thread
+        self.steps = 0                              # update() calls of the agent
+        self.updates = 0                            # learn() calls done
+        self.running = True
+        self.thread = threading.Thread(target = self.run, daemon = True)
+        self.thread.start()
         
-        # print('---samples copy---')
-        # print(samples_copy)
-        # samples_copy = zip(*samples_copy)      
-        # samples_copy = map(lambda x: Variable(torch.cat(x, 0)), samples_copy)
-        # print('---samples copy list---')
-        # print(list(samples_copy))
+    def push(self, event):  # Saves an event to the memory of the agent, for the learner to catch up with
+        with self.condition:
+            self.agent.memory.push(event)
+            self.steps += 1
+            self.condition.notify()
+            
+    def push_batch(self, events):
+        with self.condition:
+            self.agent.memory.push_batch(events)
+            self.steps += 1
+            self.condition.notify()
+            
+    def ready(self):
+        return not self.running or (len(self.agent.memory) > Memory_Samples and self.updates < self.steps * self.updates_per_step)
         
-        return samples
+    def run(self):
+        agent = self.agent
+        while True:
+            with self.condition:
+                self.condition.wait_for(self.ready)
+                if not self.running:
+                    return
+                batch_state, batch_next_state, batch_action, batch_reward = agent.memory.sample(Memory_Samples)
+            with agent.model_lock:
+                agent.learn(batch_state, batch_next_state, batch_reward, batch_action)
+            self.updates += 1
+            if self.updates % Sync_Period == 0:
+                agent.sync_policy()
+                
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
             
 # Deep Q Learning Class
 class DQN_car():
     
-    def __init__(self, input_size, nb_action, gamma):
+    def __init__(self, input_size, nb_action, gamma, updates_per_step = None):
         self.gamma = gamma                                                      # Discount rate
         self.reward_window = []                                                 # Sliding window of rewards
         self.model = Car_Network(input_size = input_size, nb_action = nb_action)    # Declaring new Neural Car_Network
         self.memory = ReplayMemory(capacity = Capacity)                           # Declaring new Replay Memory object
         self.optimizer = optim.Adam(params = self.model.parameters(), lr = Learning_Rate) # Declaring Optimizer to use for Learning
-        self.last_state = torch.Tensor(input_size).unsqueeze(0)                  # Declaring and restructing last_state
+        self.state_buffers = [torch.zeros(1, input_size), torch.zeros(1, input_size)]   # Preallocated new states, each written over the states before last
+        self.last_state = self.state_buffers[1]                                 # Declaring and restructing last_state
+        self.noise = torch.empty(1, nb_action)                                  # Preallocated noise of the draw of an action
         self.last_action = 0                                                    # Declaring last_action
         self.last_reward = 0.0                                                  # Declaring last_reward
+        self.last_states = None                                                 # Last states, actions and rewards of the rovers acting in one batch, e.g. one per world
+        self.last_actions = None
+        self.last_rewards = None
+        self.model_lock = threading.Lock()                                      # Guards the model and the optimizer against the learner thread
+        self.policies = [self.model]                                            # Networks used to act
+        self.learner = None
+        self.scheduled = False                                                  # True when the world schedules the learning with train(), instead of once per update()
+        if updates_per_step is not None:                                        # Learning in the background: acting uses two snapshots of the model, one refreshed while the other acts
+            self.policies = [copy.deepcopy(self.model), copy.deepcopy(self.model)]
+        self.actors = [trace_actor(policy) for policy in self.policies]         # Acting path of each policy, traced once
+        self.policy = self.policies[0]
+        self.actor = self.actors[0]
+        if updates_per_step is not None:
+            self.learner = Learner(self, updates_per_step)
         
-        
+    def sync_policy(self):  # Refreshes the idle snapshot in place, then swaps it in at once, so acting never waits
+        if self.learner is not None:
+            k = 1 - self.policies.index(self.policy)
+            with self.model_lock:
+                self.policies[k].load_state_dict(self.model.state_dict())
+            self.policy = self.policies[k]
+            self.actor = self.actors[k]
+    
+    def close(self):    # Stops the learner thread and waits for the checkpoints being written
+        if self.learner is not None:
+            self.learner.stop()
+        Car_Network.checkpoints.close()
+    
+    def state_buffer(self, last_state, n):  # Preallocated tensor receiving n new states: the one of two buffers not holding the last states
+        buffers = self.state_buffers
+        if buffers[0].shape[0] != n:
+            buffers = self.state_buffers = [torch.zeros(n, buffers[0].shape[1]), torch.zeros(n, buffers[0].shape[1])]
+        return buffers[1] if last_state is buffers[0] else buffers[0]
+    
     def select_action(self, state): # State is the current state vector: 3 signals, Orientation, and Negative Orientation
-        probs = F.softmax(self.model(Variable(state, volatile = True))*Temperature)       # Probability distribution of actions with Temperature
-        action = probs.multinomial(1)       # Take random draw from the probability distribution
-        # print('action')
-        # print(action)
-        # print('action.data[0, 0]')
-        # print(action.data[0, 0])
-        return action.data[0, 0]
+        with torch.inference_mode():
+            return self.actor(state, self.noise)[0]     # Random draw from the probability distribution of actions with Temperature
+    
+    def select_actions(self, states): # States of N rovers, (N, 5): one forward pass for N actions
+        if self.noise.shape[0] != states.shape[0]:
+            self.noise = torch.empty(states.shape[0], self.noise.shape[1])
+        with torch.inference_mode():
+            return self.actor(states, self.noise)     # One random draw per rover
     
     def learn(self, batch_state, batch_next_state, batch_reward, batch_action): # Learning function 
         outputs = self.model(batch_state)
@@ -140,16 +303,28 @@ class DQN_car():
         td_loss.backward(retain_graph = True)   # Perform back propagation
         self.optimizer.step()                   # Update weights
         
+    def train(self, updates):   # learn() calls on batches of the replay memory, when the world schedules the learning; returns the calls done
+        if len(self.memory) <= Memory_Samples:
+            return 0
+        for k in range(updates):
+            batch_state, batch_next_state, batch_action, batch_reward = self.memory.sample(Memory_Samples)
+            self.learn(batch_state, batch_next_state, batch_reward, batch_action)
+        return updates
+        
     def update(self, reward, new_signal):
-        new_state = torch.Tensor(new_signal).float().unsqueeze(0)   # New state is current signals and orientation
+        new_state = self.state_buffer(self.last_state, 1)   # New state is current signals and orientation
+        new_state.numpy()[0] = new_signal
         # Save new state to memory
         # print('self.last_action car')
         # # print(self.last_action)
         # print(torch.LongTensor([int(self.last_action)]))
-        self.memory.push((self.last_state, new_state, torch.LongTensor([int(self.last_action)]), torch.Tensor([self.last_reward])))
-        temp = self.last_state, new_state, torch.LongTensor([int(self.last_action)]), torch.Tensor([self.last_reward])
+        event = (self.last_state, new_state, torch.LongTensor([int(self.last_action)]), torch.Tensor([self.last_reward]))
+        if self.learner is not None:            # The learner thread learns from the new state
+            self.learner.push(event)
+        else:
+            self.memory.push(event)
         action = self.select_action(new_state) # select next action to take
-        if len(self.memory.memory) > Memory_Samples:       # Begin learning after 100 states have been transitioned
+        if self.learner is None and not self.scheduled and len(self.memory) > Memory_Samples:       # Begin learning after 100 states have been transitioned
             temp = self.memory.sample(Memory_Samples)
             batch_state, batch_next_state, batch_action, batch_reward = temp
             # print('batch_action car pre')
@@ -163,6 +338,29 @@ class DQN_car():
             del self.reward_window[0]
         return action
     
+    def update_batch(self, rewards, new_signals): # Same as update, for N rovers driven by this network, e.g. the same rover in N worlds
+        new_states = self.state_buffer(self.last_states, len(new_signals))     # (N, 5)
+        new_states.numpy()[:] = new_signals
+        if self.last_states is None or self.last_states.shape != new_states.shape:
+            self.last_states = torch.zeros(new_states.shape)
+            self.last_actions = torch.zeros(new_states.shape[0], dtype = torch.long)
+            self.last_rewards = torch.zeros(new_states.shape[0])
+        events = (self.last_states, new_states, self.last_actions, self.last_rewards)
+        if self.learner is not None:            # The learner thread learns from the N new states
+            self.learner.push_batch(events)
+        else:
+            self.memory.push_batch(events)
+        actions = self.select_actions(new_states) # select next action of every rover
+        if self.learner is None and not self.scheduled and len(self.memory) > Memory_Samples:       # Begin learning after 100 states have been transitioned
+            batch_state, batch_next_state, batch_action, batch_reward = self.memory.sample(Memory_Samples)
+            self.learn(batch_state, batch_next_state, batch_reward, batch_action)
+        self.last_actions = actions               # Update all current state variables
+        self.last_states = new_states
+        self.last_rewards = torch.Tensor(rewards)
+        self.reward_window.extend(rewards)
+        del self.reward_window[:-Reward_Window_Size]   # Keep only the last rewards in the sliding reward window
+        return actions.tolist()
+    
     def score(self):    # Returns average reward of the reward window
         rew = sum(self.reward_window)/(len(self.reward_window) + 1.0)
         #print('Avg Reward ' + str(rew), 'Last Reward: ' + str(self.reward_window[-1]))
@@ -170,29 +368,48 @@ class DQN_car():
         
     
     def save_load_best_model(self, score):    # Returns average reward of the reward window
-        print('Car_Network.best_score {0}'.format(Car_Network.best_score))
-        print('Current score {0}'.format(score))
-        if Car_Network.best_score == 0 and score == 0:
-            for layer in self.model.children():
-                if hasattr(layer, 'reset_parameters'):
-                    layer.reset_parameters()
-            print('Rover Model Reset')
-        elif score > Car_Network.best_score:
-            Car_Network.best_network_config = self.model.state_dict()
-            torch.save(Car_Network.best_network_config, 'best_rover_ai_network')
-            Car_Network.best_score = score
-            print('Best Rover Model Saved')
-        else:
-            self.model.load_state_dict(Car_Network.best_network_config)
-            print('Best Rover Model Loaded')
+        with self.model_lock:    # The learner thread must not train the model while it is replaced
+            checkpoints = Car_Network.checkpoints
+            print('Car_Network.best_score {0}'.format(checkpoints.best_score))
+            print('Current score {0}'.format(score))
+            if checkpoints.best_score == 0 and score == 0:
+                for layer in self.model.children():
+                    if hasattr(layer, 'reset_parameters'):
+                        layer.reset_parameters()
+                print('Rover Model Reset')
+            elif score > checkpoints.best_score:
+                checkpoints.save_best(score, self.model, self.optimizer)
+                print('Best Rover Model Saved')
+            elif checkpoints.best is not None:
+                checkpoints.restore_best(self.model, self.optimizer)
+                print('Best Rover Model Loaded')
+        self.sync_policy()
         return
     
+    def save(self, path = Pretrained_Path):
+        with self.model_lock:
+            torch.save({'state_dict': self.model.state_dict(),
+                        'optimizer': self.optimizer.state_dict()},
+                        path)
+    
+    def load(self, path = Pretrained_Path):
+        if os.path.isfile(path):
+            print('=> Loading Model...')
+            checkpoint = torch.load(path)
+            with self.model_lock:
+                self.model.load_state_dict(checkpoint['state_dict'])
+                self.optimizer.load_state_dict(checkpoint['optimizer'])
+            self.sync_policy()
+            print('Load Completed')
+        else:
+            print('No file named ' + path + ' found')
+    
     def plot(self):
         pass
 
 class DQN_car_cluster():
     
-    def __init__(self, input_size, nb_action, gamma):
+    def __init__(self, input_size, nb_action, gamma, updates_per_step = None):
         self.gamma = gamma                                                      # Discount rate
         self.reward_window = []                                                 # Sliding window of rewards
         self.model = Cluser_Network(input_size = input_size, nb_action = nb_action)    # Declaring new Neural Car_Network
@@ -201,11 +418,29 @@ class DQN_car_cluster():
         self.last_state = torch.Tensor(input_size).unsqueeze(0)                  # Declaring and restructing last_state
         self.last_action = torch.Tensor(nb_action)                  # Declaring last_action
         self.last_reward = 0.0                                                  # Declaring last_reward
-        self.best_score = 0
-        self.best_network_config = self.model.state_dict()
+        self.checkpoints = CheckpointManager('best_cluster_ai_network')         # Best cluster network
+        self.model_lock = threading.Lock()                                      # Guards the model and the optimizer against the learner thread
+        self.policy = self.model                                                # Network used to act
+        self.learner = None
+        self.scheduled = False                                                  # True when the world schedules the learning with train(), instead of once per update()
+        if updates_per_step is not None:                                        # Learning in the background: acting uses a snapshot of the model
+            self.policy = copy.deepcopy(self.model)
+            self.learner = Learner(self, updates_per_step)
+    
+    def sync_policy(self):  # Refreshes the snapshot used to act; the new one is swapped in at once, so acting never waits
+        if self.learner is not None:
+            with self.model_lock:
+                policy = copy.deepcopy(self.model)
+            self.policy = policy
+    
+    def close(self):    # Stops the learner thread and waits for the checkpoints being written
+        if self.learner is not None:
+            self.learner.stop()
+        self.checkpoints.close()
     
     def select_action(self, state): # State is the current state vector: 3 signals, Orientation, and Negative Orientation
-        raw_values = self.model(Variable(state, volatile = True))
+        with torch.inference_mode():
+            raw_values = self.policy(state)
         actions = (raw_values - torch.min(raw_values)) / (torch.max(raw_values) - torch.min(raw_values)) * 50 - 20 # Normalize actions to between 0 and 100
         actions = actions.data[0]
         # actions = raw_values.data[0]
@@ -229,31 +464,38 @@ class DQN_car_cluster():
         # print(outputs) 
         # outputs = outputs.gather(1, batch_action.unsqueeze(1)).squeeze(1)
 
-        next_outputs = self.model(batch_next_state)
+        next_outputs = self.model(batch_next_state).detach()
         
         # print('next_outputs cluster')
         # print(next_outputs) 
         
-        # target = self.gamma * next_outputs + batch_reward
-        target = []
-        for i in range (0,len(batch_reward)):
-            target.append(self.gamma * next_outputs[i,:] + batch_reward[i])
-        # print('target cluster')
-        # print(target[0])
-        td_loss =  F.smooth_l1_loss(outputs, target[0])    # Compute TD Loss
+        target = batch_reward.unsqueeze(1) + self.gamma * next_outputs    # (batch, actions): the reward of each sample, broadcast over its actions
+        td_loss =  F.smooth_l1_loss(outputs, target)    # Compute TD Loss
         self.optimizer.zero_grad()              # Initialize the Optimizer
         td_loss.backward(retain_graph = True)   # Perform back propagation
         self.optimizer.step()                   # Update weights
         
+    def train(self, updates):   # learn() calls on batches of the replay memory, when the world schedules the learning; returns the calls done
+        if len(self.memory) <= Memory_Samples:
+            return 0
+        for k in range(updates):
+            batch_state, batch_next_state, batch_action, batch_reward = self.memory.sample(Memory_Samples)
+            self.learn(batch_state, batch_next_state, batch_reward, batch_action)
+        return updates
+        
     def update(self, reward, map_state):
         new_state = torch.Tensor(map_state).float().unsqueeze(0)   # New state is current signals and orientation
         self.last_action = torch.unsqueeze(self.last_action,0)
         # Save new state to memory
         # print('self.last_action cluster')
         # print(self.last_action)
-        self.memory.push((self.last_state, new_state, self.last_action, torch.Tensor([self.last_reward])))
+        event = (self.last_state, new_state, self.last_action, torch.Tensor([self.last_reward]))
+        if self.learner is not None:            # The learner thread learns from the new state
+            self.learner.push(event)
+        else:
+            self.memory.push(event)
         action = self.select_action(new_state) # select next action to take
-        if len(self.memory.memory) > Memory_Samples:       # Begin learning after 100 states have been transitioned
+        if self.learner is None and not self.scheduled and len(self.memory) > Memory_Samples:       # Begin learning after 100 states have been transitioned
             temp = self.memory.sample(Memory_Samples)
             batch_state, batch_next_state, batch_action, batch_reward = temp
             # print('batch_action cluster pre')
@@ -268,14 +510,14 @@ class DQN_car_cluster():
         return action
                 
     def save_load_best_model(self, score):    # Returns average reward of the reward window
-        if score > self.best_score:
-            self.best_network_config = self.model.state_dict()
-            torch.save(self.best_network_config, 'best_cluster_ai_network')
-            self.best_score = score
-            print('Best Model Saved')
-        else:
-            self.model.load_state_dict(self.best_network_config)
-            print('Best Model Loaded')
+        with self.model_lock:    # The learner thread must not train the model while it is replaced
+            if score > self.checkpoints.best_score:
+                self.checkpoints.save_best(score, self.model, self.optimizer)
+                print('Best Model Saved')
+            elif self.checkpoints.best is not None:
+                self.checkpoints.restore_best(self.model, self.optimizer)
+                print('Best Model Loaded')
+        self.sync_policy()
         return
     
 
@@ -0,0 +1,149 @@
+# Benchmarks of Mission Scenario 2
+# Throughput of the simulation and latency of the rover and cluster AIs over a pinned scenario (sand layout, goals and seeds),
+# written to a JSON file so that two runs can be diffed
+
+# Importing the libraries
+import argparse
+import json
+import platform
+import random
+import resource
+import time
+
+import numpy as np
+import torch
+
+from rohaan_ai import DQN_car, DQN_car_cluster, ReplayMemory, Memory_Samples, Capacity
+from rohaan_mission import make_world, make_vec_env
+from rohaan_vec import act, brain_groups
+
+Map_Width = 1000
+Map_Height = 800
+Sand_Layout = [(300, 420, 150, 650), (600, 900, 500, 560), (100, 250, 80, 200)]   # Rectangles [x0, x1) x [y0, y1) of sand
+World_Counts = [1, 8, 32]
+Batch_Sizes = [32, 100, 256, 1024, 4096]
+
+def seed_everything(seed):  # The goals and first reward coefficients come from the seed of the world; the actions and samples from these generators
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+def timeit(function, repeats):  # Median latency of function() in microseconds
+    function()      # Warm up
+    times = []
+    for r in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1e6
+
+def peak_rss():     # Peak resident memory of this process in megabytes (ru_maxrss is in kilobytes on Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+def loop_target(gamma, next_outputs, batch_reward):    # Target built one sample at a time, as DQN_car_cluster.learn used to
+    target = []
+    for i in range(0, len(batch_reward)):
+        target.append(gamma * next_outputs[i,:] + batch_reward[i])
+    return torch.stack(target)
+
+def vector_target(gamma, next_outputs, batch_reward):  # Target built in one operation, as DQN_car_cluster.learn does
+    return batch_reward.unsqueeze(1) + gamma * next_outputs
+
+def pinned_world(seed, cluster):
+    seed_everything(seed)
+    world = make_world(Map_Width, Map_Height, seed = seed, verbose = False, cluster = cluster)
+    world.checkpoint_period = 0     # The benchmark never overwrites the saved best models
+    for x0, x1, y0, y1 in Sand_Layout:
+        world.fill_sand(x0, x1, y0, y1, 1)
+    return world
+
+def bench_ticks(steps, seed, cluster):  # Ticks per second of the whole world, learning included
+    world = pinned_world(seed, cluster)
+    start = time.perf_counter()
+    for t in range(steps):
+        world.step()
+    elapsed = time.perf_counter() - start
+    return {'rovers': len(world.fleet), 'cluster': cluster, 'steps': steps, 'ticks_per_s': steps / elapsed,
+            'goals': world.total_goals_achieved, 'collisions': world.total_collisions}
+
+def bench_vec(n_worlds, steps, seed):     # Transitions per second of worlds stepped in lockstep, learning included
+    seed_everything(seed)
+    env, brains = make_vec_env(n_worlds, Map_Width, Map_Height, seed = seed)
+    for x0, x1, y0, y1 in Sand_Layout:
+        env.fill_sand(x0, x1, y0, y1, 1)
+    groups = brain_groups(brains)
+    observations = env.reset()
+    rewards = np.zeros((n_worlds, env.n_rovers))
+    start = time.perf_counter()
+    for t in range(steps):
+        observations, rewards = env.step(act(groups, rewards, observations))
+    elapsed = time.perf_counter() - start
+    return {'worlds': n_worlds, 'rovers': env.n_rovers, 'steps': steps, 'transitions_per_s': steps * n_worlds * env.n_rovers / elapsed,
+            'goals': int(env.goals_achieved.sum()), 'collisions': int(env.collisions.sum())}
+
+def batch(input_size, nb_action, batch_size, action_shape):
+    return (torch.randn(batch_size, input_size), torch.randn(batch_size, input_size),
+            torch.randn(batch_size), torch.randint(nb_action, (batch_size,)) if action_shape is None else torch.randn(batch_size, *action_shape))
+
+def bench_brains(repeats, seed):
+    seed_everything(seed)
+    car = DQN_car(5, 3, 0.9)
+    cluster = DQN_car_cluster(14, 10, 0.9)
+    memory = ReplayMemory(Capacity)
+    event = (torch.randn(1, 5), torch.randn(1, 5), torch.LongTensor([1]), torch.Tensor([0.5]))
+    for k in range(Memory_Samples * 10):
+        memory.push(event)
+    car_state = torch.randn(1, 5)
+    cluster_state = torch.randn(1, 14)
+    results = {'car_select_action_us': timeit(lambda: car.select_action(car_state), repeats),
+               'cluster_select_action_us': timeit(lambda: cluster.select_action(cluster_state), repeats),
+               'memory_push_us': timeit(lambda: memory.push(event), repeats),
+               'memory_sample_us': timeit(lambda: memory.sample(Memory_Samples), repeats),
+               'car_learn_us': {}, 'cluster_learn_us': {}, 'loop_target_us': {}, 'vector_target_us': {}}
+    for batch_size in Batch_Sizes:
+        car_batch = batch(5, 3, batch_size, None)
+        cluster_batch = batch(14, 10, batch_size, (10,))
+        next_outputs = torch.randn(batch_size, 10)
+        results['car_learn_us'][str(batch_size)] = timeit(lambda: car.learn(*car_batch), repeats)
+        results['cluster_learn_us'][str(batch_size)] = timeit(lambda: cluster.learn(*cluster_batch), repeats)
+        results['loop_target_us'][str(batch_size)] = timeit(lambda: loop_target(0.9, next_outputs, cluster_batch[2]), repeats)
+        results['vector_target_us'][str(batch_size)] = timeit(lambda: vector_target(0.9, next_outputs, cluster_batch[2]), repeats)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Benchmark the simulation and the AIs of Mission Scenario 2 over a pinned scenario.')
+    parser.add_argument('--steps', type = int, default = 1000, help = 'timesteps simulated with and without the cluster AI')
+    parser.add_argument('--worlds', type = int, nargs = '+', default = World_Counts, help = 'world counts stepped in lockstep')
+    parser.add_argument('--repeats', type = int, default = 50, help = 'timed calls per latency')
+    parser.add_argument('--seed', type = int, default = 0, help = 'seed of the goals, actions and samples')
+    parser.add_argument('--output', default = 'plots/benchmark.json', help = 'JSON file receiving the results')
+    args = parser.parse_args()
+
+    results = {'mission': 'Mission Scenario 2', 'seed': args.seed, 'steps': args.steps, 'repeats': args.repeats,
+               'python': platform.python_version(), 'numpy': np.__version__, 'torch': torch.__version__,
+               'machine': platform.machine(), 'threads': torch.get_num_threads(), 'ticks': []}
+    for cluster in (False, True):
+        ticks = bench_ticks(args.steps, args.seed, cluster)
+        print('{0} rovers, cluster AI {1}: {2:8.0f} ticks/s'.format(ticks['rovers'], 'on' if cluster else 'off', ticks['ticks_per_s']))
+        results['ticks'].append(ticks)
+    results['vec'] = []
+    for n_worlds in args.worlds:
+        vec = bench_vec(n_worlds, args.steps, args.seed)
+        print('{0:>3} worlds: {1:8.0f} transitions/s'.format(n_worlds, vec['transitions_per_s']))
+        results['vec'].append(vec)
+    results['brains'] = bench_brains(args.repeats, args.seed)
+    results['peak_rss_mb'] = peak_rss()
+    brains = results['brains']
+    for name in ('car_select_action_us', 'cluster_select_action_us', 'memory_push_us', 'memory_sample_us'):
+        print('{0}: {1:.1f}'.format(name, brains[name]))
+    print('{0:>6} {1:>12} {2:>16} {3:>18} {4:>18}'.format('batch', 'car learn', 'cluster learn', 'loop target', 'vector target'))
+    for batch_size in Batch_Sizes:
+        print('{0:>6} {1:>10.0f}us {2:>14.0f}us {3:>16.0f}us {4:>16.0f}us'.format(batch_size,
+            *[brains[name][str(batch_size)] for name in ('car_learn_us', 'cluster_learn_us', 'loop_target_us', 'vector_target_us')]))
+    print('peak_rss_mb: {0:.1f}'.format(results['peak_rss_mb']))
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent = 2, sort_keys = True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# Rover Maps
+# Standard sand maps imported from PNG masks or heightmap arrays, rasterized to the cells of a map of any size
+# in one vectorized pass, and cached as .npy files keyed by the hash of their source and of the rasterization
+
+# Importing the libraries
+import argparse
+import glob
+import hashlib
+import os
+import time
+import numpy as np
+import matplotlib.image as mpimg
+
+Cache_Dir = 'maps_cache'    # Directory of the rasterized maps
+Sand_Threshold = 0.5        # Share of a cell covered by bright (or high) source pixels above which it holds sand
+Band_Columns = 1024         # Columns of the map rasterized at once, bounding the memory of very large maps
+Hash_Block = 1 << 20        # Bytes of the source read at a time by the hash
+
+# Sources: an image (PNG mask, bright pixels being sand, transparent ones not) or a .npy heightmap, high cells being sand.
+# Both are read as rows from the top of the map, as images are, and turned into a field in [0, 1] indexed [x, y] from the bottom left.
+
+def read_field(path):
+    if path.endswith('.npy'):
+        values = np.load(path).astype(float)
+        if values.ndim != 2:
+            raise ValueError(path + ' is not a 2D heightmap')
+        low, high = values.min(), values.max()
+        values = (values - low) / (high - low) if high > low else np.zeros(values.shape)
+    else:
+        values = mpimg.imread(path)
+        if values.dtype == np.uint8:    # Images other than PNG come as bytes
+            values = values / 255.
+        if values.ndim == 3:
+            alpha = values[:, :, 3] if values.shape[2] == 4 else 1.
+            values = values[:, :, :3].mean(axis = 2) * alpha
+    return np.asarray(values, dtype = float)[::-1].T
+
+def rasterize(field, width, height, threshold = Sand_Threshold):    # Cells of a width x height map: the mean of the field over each cell, thresholded
+    w, h = field.shape
+    sat = np.zeros((w + 1, h + 1))
+    sat[1:, 1:] = field.cumsum(0).cumsum(1)
+    x_edges = np.arange(width + 1) * w // width     # Source pixels covered by each cell, at least one when the map is finer than the source
+    y_edges = np.arange(height + 1) * h // height
+    x0 = x_edges[:-1]
+    x1 = np.maximum(x_edges[1:], x0 + 1)
+    y0 = y_edges[None, :-1]
+    y1 = np.maximum(y_edges[1:], y_edges[:-1] + 1)[None, :]
+    cells = np.zeros((width, height), dtype = np.uint8)
+    for start in range(0, width, Band_Columns):
+        a0 = x0[start:start + Band_Columns, None]
+        a1 = x1[start:start + Band_Columns, None]
+        sums = sat[a1, y1] - sat[a0, y1] - sat[a1, y0] + sat[a0, y0]
+        cells[start:start + Band_Columns] = sums >= threshold * (a1 - a0) * (y1 - y0)
+    return cells
+
+def source_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(Hash_Block), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_path(path, width, height, threshold, invert, cache_dir = Cache_Dir):  # Changing the source or any parameter gives another file
+    key = hashlib.sha256('{0} {1} {2} {3!r} {4}'.format(source_hash(path), width, height, threshold, invert).encode()).hexdigest()
+    return os.path.join(cache_dir, key[:32] + '.npy')
+
+def load_map(path, width, height, threshold = Sand_Threshold, invert = False, cache_dir = Cache_Dir):  # (width, height) cells of sand of the map at path
+    cached = cache_path(path, width, height, threshold, invert, cache_dir) if cache_dir is not None else None
+    if cached is not None and os.path.exists(cached):
+        return np.load(cached)
+    field = read_field(path)
+    cells = rasterize(1. - field if invert else field, width, height, threshold)
+    if cached is not None:  # Atomic: a sweep starting many processes at once never reads a partial file
+        os.makedirs(cache_dir, exist_ok = True)
+        temp_path = cached + '.' + str(os.getpid()) + '.tmp'
+        with open(temp_path, 'wb') as f:
+            np.save(f, cells)
+        os.replace(temp_path, cached)
+    return cells
+
+# Rasterizing maps ahead of a sweep, so that its runs find them in the cache
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Rasterize sand maps into the cache read by the missions and benchmarks.')
+    parser.add_argument('sources', nargs = '+', help = 'PNG masks or .npy heightmaps, or patterns such as maps/*.png')
+    parser.add_argument('--width', type = int, default = 1000, help = 'width of the map')
+    parser.add_argument('--height', type = int, default = 800, help = 'height of the map')
+    parser.add_argument('--threshold', type = float, default = Sand_Threshold, help = 'share of a cell covered by bright or high pixels making it sand')
+    parser.add_argument('--invert', action = 'store_true', help = 'dark or low pixels are sand')
+    parser.add_argument('--cache-dir', default = Cache_Dir, help = 'directory of the rasterized maps')
+    args = parser.parse_args()
+
+    for path in sorted(set(path for pattern in args.sources for path in (glob.glob(pattern) or [pattern]))):
+        cached = os.path.exists(cache_path(path, args.width, args.height, args.threshold, args.invert, args.cache_dir))
+        start = time.time()
+        cells = load_map(path, args.width, args.height, args.threshold, args.invert, args.cache_dir)
+        print('{0}: {1:.1%} sand, {2} in {3:.3f}s'.format(path, cells.mean(), 'cached' if cached else 'rasterized', time.time() - start))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+# Mission Scenario 2 - 2 Networks 2 Rovers
+# Builds the rover world of this mission, and trains it headless when run as a script
+
+# Importing the libraries
+import argparse
+import time
+
+import numpy as np
+
+from rohaan_ai import DQN_car
+from rohaan_ai import DQN_car_cluster
+from rohaan_world import RoverFleet, RoverWorld, SensorArray, TickScheduler, Car_Speed, Sensor_Distance
+from rohaan_telemetry import Telemetry, world_columns, world_row
+from rohaan_maps import load_map
+from rohaan_terrain import ChunkedTerrain
+from rohaan_transitions import TransitionLog
+from rohaan_vec import RoverVecEnv, act, brain_groups
+
+# Rewards
+GOAL_ACHIEVED_REWARD = 50
+WALL_PENALTIES = [-1, -100] # Penalty of each rover for touching the edges of the map
+
+COLLISION_RADIUS = 15 # Rovers closer than this (on both axes) collide
+SCORE_PERIOD = 50 # Timesteps between two points of the score curves
+CHECKPOINT_PERIOD = 500 # Timesteps between two save/load of the best models
+CLUSTER_PERIOD = 50 # Timesteps between two actions of the cluster AI, which learns from the mean of their rewards; the rovers act at every timestep
+
+REWARD_WEIGHT_NAMES = ['living_penalty1', 'getting_closer_bonus1', 'collision_penalty1', 'sand_penalty1', 'goal_reached1',
+                       'living_penalty2', 'getting_closer_bonus2', 'collision_penalty2', 'sand_penalty2', 'goal_reached2']
+
+def random_reward_weights(rng):   # living penalty, getting closer bonus, collision penalty, sand penalty, goal reward, for each rover
+    weights = []
+    for rover in range(2):
+        weights += [rng.uniform(0,1) * -1,
+                    rng.uniform(0,1),
+                    rng.uniform(0,100) * -1,
+                    rng.uniform(0,50) * -1,
+                    GOAL_ACHIEVED_REWARD]
+    return weights
+
+def set_reward_weights(world, weights):  # The first set of coefficients drives every rover
+    world.reward_weights = list(weights)
+    rewards = world.fleet.rewards
+    rewards['living'][:] = weights[0]
+    rewards['closer'][:] = weights[1]
+    rewards['collision'][:] = weights[2]
+    rewards['sand'][:] = weights[3]
+
+def start_positions(width, height):    # Positions and velocities of the rovers when the mission starts
+    center_x = width / 2
+    center_y = height / 2
+    return [(center_x, center_y - 10), (center_x, center_y + 10)], [(Car_Speed, 0), (-Car_Speed, 0)]
+
+def make_world(width, height, seed = None, verbose = True, cluster = True, updates_per_step = None, terrain = None, scheduler = None, sensors = None, cluster_period = CLUSTER_PERIOD):
+    # Without the cluster AI, the reward coefficients stay as set and no best model is saved (e.g. when tuned by rohaan_pbt.py)
+    sensors = sensors if sensors is not None else SensorArray()   # 3 sensors by default
+    brains = [DQN_car(len(sensors) + 2,3,0.9, updates_per_step), DQN_car(len(sensors) + 2,3,0.9, updates_per_step)]  # sensors and orientations, 3 actions, gama = 0.9
+    positions, velocities = start_positions(width, height)
+    fleet = RoverFleet(brains, positions, velocities, {'wall': WALL_PENALTIES, 'goal': GOAL_ACHIEVED_REWARD}, sensor_array = sensors)
+    if cluster:
+        cluster_ai = DQN_car_cluster(14, 10, 0.9, updates_per_step) # State: car1 1, car1 y, car1 velocity x, car1 velocity y, car1 orientation, x2, y2, vx2, vy2, o2, x_goal1, y_goal1, x_goal2, y_goal2,
+                                                  # Actions: Rewards for living penalty, getting closer bonus, collision penalty, sand penalty, goal reached reward for both cars
+        world = RoverWorld(width, height, fleet, COLLISION_RADIUS, SCORE_PERIOD, cluster_ai = cluster_ai,
+                           checkpoint_period = CHECKPOINT_PERIOD, seed = seed, verbose = verbose, terrain = terrain,
+                           scheduler = scheduler, cluster_period = cluster_period)
+    else:
+        world = RoverWorld(width, height, fleet, COLLISION_RADIUS, SCORE_PERIOD, seed = seed, verbose = verbose, terrain = terrain,
+                           scheduler = scheduler)
+    set_reward_weights(world, random_reward_weights(world.rng))
+    return world
+
+def make_vec_env(n_worlds, width, height, seed = None, updates_per_step = None, sensors = None):   # n_worlds copies of the mission without the cluster AI, and the brain of each rover
+    sensors = sensors if sensors is not None else SensorArray()
+    brains = [DQN_car(len(sensors) + 2,3,0.9, updates_per_step), DQN_car(len(sensors) + 2,3,0.9, updates_per_step)]  # each acts for its rover of every world in one batch
+    positions, velocities = start_positions(width, height)
+    env = RoverVecEnv(n_worlds, width, height, positions, velocities, {'wall': WALL_PENALTIES, 'goal': GOAL_ACHIEVED_REWARD},
+                      COLLISION_RADIUS, sensor_array = sensors, seed = seed)
+    rewards = env.rewards
+    for e in range(n_worlds):   # Reward coefficients drawn for each world, as the first ones of a single world
+        weights = random_reward_weights(env.rng)
+        rewards['living'][e] = weights[0]
+        rewards['closer'][e] = weights[1]
+        rewards['collision'][e] = weights[2]
+        rewards['sand'][e] = weights[3]
+    return env, brains
+
+# Running many worlds at once without any display
+
+def run_vec(env, brains, steps, report):  # Steps every world of env in lockstep, each brain acting for its rovers of every world at once
+    groups = brain_groups(brains)
+    observations = env.reset()
+    rewards = np.zeros((env.n_worlds, env.n_rovers))
+    start = time.time()
+    for t in range(1, steps + 1):
+        observations, rewards = env.step(act(groups, rewards, observations))
+        if t % report == 0:
+            print('Timestep: {0}  Worlds: {1}  Goals: {2}  Collisions: {3}  Transitions/s: {4:.0f}'.format(
+                env.timestep, env.n_worlds, env.goals_achieved.sum(), env.collisions.sum(), t * env.n_worlds * env.n_rovers / (time.time() - start)))
+
+# Running the mission without any display
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Train the rovers of Mission Scenario 2 without the Kivy viewer.')
+    parser.add_argument('--steps', type = int, default = 100000, help = 'number of timesteps to simulate')
+    parser.add_argument('--width', type = int, default = 1000, help = 'width of the map')
+    parser.add_argument('--height', type = int, default = 800, help = 'height of the map')
+    parser.add_argument('--updates-per-step', type = float, default = None, help = 'learn in background threads, with this many updates per timestep')
+    parser.add_argument('--seed', type = int, default = None, help = 'seed of the goals and reward coefficients')
+    parser.add_argument('--telemetry', default = None, help = 'CSV file receiving the training metrics, with the plots saved next to it')
+    parser.add_argument('--terrain', default = None, help = 'directory of a chunked, memory-mapped sand map, for maps too large for the memory')
+    parser.add_argument('--tick-budget', type = float, default = None, help = 'milliseconds per timestep: learn as much as fits in them, instead of once per timestep')
+    parser.add_argument('--rays', type = int, default = None, help = 'sensor rays fanned around each rover, instead of the 3 sensors at 0, 30 and -30 degrees')
+    parser.add_argument('--fan', type = float, default = 60., help = 'degrees covered by the rays')
+    parser.add_argument('--ray-samples', type = int, default = 1, help = 'sand samples along each ray')
+    parser.add_argument('--sensor-range', type = float, default = Sensor_Distance, help = 'length of the rays')
+    parser.add_argument('--cluster-period', type = int, default = CLUSTER_PERIOD, help = 'timesteps between two actions and learning steps of the cluster AI')
+    parser.add_argument('--map', default = None, help = 'PNG mask or .npy heightmap of the sand, rasterized to the map and cached (see rohaan_maps.py)')
+    parser.add_argument('--invert-map', action = 'store_true', help = 'dark or low pixels of the map are sand')
+    parser.add_argument('--log', default = None, help = 'binary log receiving the transitions of the rovers, appended to if it exists (see rohaan_pretrain.py)')
+    parser.add_argument('--worlds', type = int, default = None, help = 'step this many independent worlds in lockstep, the rovers of every world acting in one batch (no telemetry, log, terrain or tick budget)')
+    parser.add_argument('--report', type = int, default = 1000, help = 'timesteps between two progress reports')
+    args = parser.parse_args()
+    if args.worlds is not None and (args.telemetry or args.terrain or args.tick_budget or args.log):
+        parser.error('--worlds runs without --telemetry, --log, --terrain and --tick-budget')
+
+    sensors = None
+    if args.rays is not None:
+        sensors = SensorArray.fan(args.rays, args.fan, args.sensor_range, args.ray_samples)
+    if args.worlds is not None:
+        env, brains = make_vec_env(args.worlds, args.width, args.height, seed = args.seed, updates_per_step = args.updates_per_step, sensors = sensors)
+        if args.map is not None:
+            env.load_sand(load_map(args.map, args.width, args.height, invert = args.invert_map))
+        run_vec(env, brains, args.steps, args.report)
+        for brain in brains:
+            brain.close()
+        return
+    terrain = None
+    if args.terrain is not None:
+        terrain = ChunkedTerrain(args.width, args.height, path = args.terrain)
+    scheduler = None
+    if args.tick_budget is not None:
+        scheduler = TickScheduler(budget = args.tick_budget / 1000.)
+    world = make_world(args.width, args.height, seed = args.seed, verbose = False, updates_per_step = args.updates_per_step, terrain = terrain,
+                       scheduler = scheduler, sensors = sensors, cluster_period = args.cluster_period)
+    if args.map is not None:
+        world.load_sand(load_map(args.map, args.width, args.height, invert = args.invert_map))
+    if args.log is not None:
+        world.transition_log = TransitionLog(args.log, len(world.fleet.sensor_array) + 2)     # States: signals and orientations
+    telemetry = None
+    if args.telemetry is not None:
+        telemetry = Telemetry(world_columns(world, REWARD_WEIGHT_NAMES), args.telemetry)
+    start = time.time()
+    for t in range(1, args.steps + 1):
+        world.step()
+        if telemetry is not None:
+            telemetry.record(world_row(world))
+        if t % args.report == 0:
+            report = 'Timestep: {0}  Goals: {1}  Collisions: {2}  Ticks/s: {3:.0f}'.format(
+                world.timestep, world.total_goals_achieved, world.total_collisions, t / (time.time() - start))
+            if scheduler is not None:
+                report += '  Updates/Step: {0:.2f}'.format(scheduler.ratio())
+            print(report)
+    if telemetry is not None:
+        telemetry.close()
+    world.terrain.flush()
+    if world.transition_log is not None:
+        world.transition_log.close()
+    for brain in world.fleet.brains:
+        brain.close()
+    if world.cluster_ai is not None:
+        world.cluster_ai.close()
+
+if __name__ == '__main__':
+    main()
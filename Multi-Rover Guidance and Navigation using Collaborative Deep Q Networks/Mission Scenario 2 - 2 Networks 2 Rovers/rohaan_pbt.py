@@ -0,0 +1,132 @@
+# Population Based Training of the reward coefficients
+# Runs K headless worlds of Mission Scenario 2 in worker processes, each with its own reward coefficients and rover networks.
+# Every round, the worst workers copy the rover networks of the best ones and train on with perturbed coefficients.
+
+# Importing the libraries
+import argparse
+import multiprocessing
+import time
+
+import numpy as np
+import torch
+
+from rohaan_mission import make_world, set_reward_weights
+
+Perturb_Factors = [0.8, 1.2]    # Each coefficient of an exploiting worker is scaled by one of these
+Truncation = 0.25               # Fraction of the population copied from the best workers each round
+Tuned_Weights = 4               # Coefficients searched: living, closer, collision and sand, the first set, which drives every rover (see set_reward_weights)
+
+# Worker process: owns one world and trains it on request
+
+def run_worker(conn, width, height, seed):
+    torch.set_num_threads(1)    # One core per worker
+    world = make_world(width, height, seed = seed, verbose = False, cluster = False)
+    while True:
+        command, arg = conn.recv()
+        if command == 'train':  # Score: goals achieved per timestep (as score_t) over this round
+            goals = world.total_goals_achieved
+            for t in range(arg):
+                world.step()
+            conn.send((world.total_goals_achieved - goals) / arg)
+        elif command == 'get':
+            brains = world.fleet.brains
+            conn.send(([brain.model.state_dict() for brain in brains], [brain.optimizer.state_dict() for brain in brains], world.reward_weights))
+        elif command == 'set':
+            models, optimizers, weights = arg
+            for brain, model, optimizer in zip(world.fleet.brains, models, optimizers):
+                brain.model.load_state_dict(model)
+                brain.optimizer.load_state_dict(optimizer)
+            set_reward_weights(world, weights)
+            conn.send(None)
+        elif command == 'stop':
+            break
+    conn.close()
+
+# Population of worker processes
+
+class Population(object):
+
+    def __init__(self, size, width, height, seed = None):
+        self.rng = np.random.default_rng(seed)
+        context = multiprocessing.get_context('spawn')
+        self.connections = []
+        self.workers = []
+        for k in range(size):
+            conn, worker_conn = context.Pipe()
+            worker = context.Process(target = run_worker, args = (worker_conn, width, height, None if seed is None else seed + k), daemon = True)
+            worker.start()
+            self.connections.append(conn)
+            self.workers.append(worker)
+        self.scores = np.zeros(size)    # Score of each worker over the last round
+
+    def __len__(self):
+        return len(self.workers)
+
+    def train(self, steps):     # Every worker trains for steps timesteps, in parallel
+        for conn in self.connections:
+            conn.send(('train', steps))
+        self.scores = np.array([conn.recv() for conn in self.connections])
+        return self.scores
+
+    def get(self, k):
+        self.connections[k].send(('get', None))
+        return self.connections[k].recv()
+
+    def set(self, k, models, optimizers, weights):
+        self.connections[k].send(('set', (models, optimizers, weights)))
+        self.connections[k].recv()
+
+    def perturb(self, weights):
+        weights = list(weights)
+        for i in range(Tuned_Weights):  # The goal rewards and the second set, which no rover reads, are kept as they are
+            weights[i] *= self.rng.choice(Perturb_Factors)
+        return weights
+
+    def exploit_and_explore(self):  # The worst workers restart from the best ones, with perturbed coefficients
+        n = max(1, int(len(self) * Truncation))
+        ranking = np.argsort(self.scores)
+        replaced = []
+        for worst, best in zip(ranking[:n], ranking[::-1][:n]):
+            if self.scores[worst] >= self.scores[best]:
+                continue
+            models, optimizers, weights = self.get(best)
+            self.set(worst, models, optimizers, self.perturb(weights))
+            replaced.append((int(worst), int(best)))
+        return replaced
+
+    def close(self):
+        for conn in self.connections:
+            conn.send(('stop', None))
+        for worker in self.workers:
+            worker.join()
+
+# Running the search
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Tune the reward coefficients of Mission Scenario 2 by population based training.')
+    parser.add_argument('--population', type = int, default = multiprocessing.cpu_count(), help = 'number of worker processes')
+    parser.add_argument('--rounds', type = int, default = 20, help = 'number of exploit/explore rounds')
+    parser.add_argument('--steps', type = int, default = 2000, help = 'timesteps trained by each worker per round')
+    parser.add_argument('--width', type = int, default = 1000, help = 'width of the map')
+    parser.add_argument('--height', type = int, default = 800, help = 'height of the map')
+    parser.add_argument('--seed', type = int, default = None, help = 'seed of the workers and of the perturbations')
+    parser.add_argument('--save', default = 'pbt_best_rover_ai_networks', help = 'file receiving the networks and coefficients of the best worker')
+    args = parser.parse_args()
+
+    population = Population(args.population, args.width, args.height, seed = args.seed)
+    start = time.time()
+    for generation in range(1, args.rounds + 1):
+        scores = population.train(args.steps)
+        best = int(np.argmax(scores))
+        print('Round: {0}  Best: {1:.4f} (worker {2})  Mean: {3:.4f}  Ticks/s: {4:.0f}'.format(
+            generation, scores[best], best, scores.mean(), generation * args.steps * len(population) / (time.time() - start)))
+        if generation < args.rounds:
+            for worst, copied in population.exploit_and_explore():
+                print('  worker {0} <- worker {1}'.format(worst, copied))
+    models, optimizers, weights = population.get(best)
+    print('Best reward coefficients (living, closer, collision, sand): ' + ', '.join('{0:.3f}'.format(w) for w in weights[:Tuned_Weights]))
+    torch.save({'models': models, 'reward_weights': weights[:Tuned_Weights]}, args.save)
+    population.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# Offline training of Mission Scenario 2
+# Pre-trains the rover network from transition logs written by the viewer or by rohaan_mission.py --log,
+# as fast as the CPU allows and without the simulator; the result is loaded like any saved brain
+
+# Importing the libraries
+import argparse
+import glob
+import time
+
+import numpy as np
+import torch
+
+from rohaan_ai import DQN_car, Pretrained_Path
+from rohaan_transitions import TransitionDataset
+
+def pretrain(brain, dataset, updates, batch_size, seed = None, report = 0):  # updates learn() calls on batches drawn from the logs
+    rng = np.random.default_rng(seed)
+    start = time.time()
+    for k in range(1, updates + 1):
+        batch_state, batch_next_state, batch_action, batch_reward = [torch.from_numpy(a) for a in dataset.sample(batch_size, rng)]
+        brain.learn(batch_state, batch_next_state, batch_reward, batch_action)
+        if report and k % report == 0:
+            print('Updates: {0}  Updates/s: {1:.0f}'.format(k, k / (time.time() - start)))
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Pre-train the rover network (Car_Network) of Mission Scenario 2 from transition logs.')
+    parser.add_argument('logs', nargs = '+', help = 'transition logs, or patterns such as transitions/*.log')
+    parser.add_argument('--updates', type = int, default = 10000, help = 'learn() calls')
+    parser.add_argument('--batch-size', type = int, default = 1024, help = 'transitions per learn() call')
+    parser.add_argument('--seed', type = int, default = None, help = 'seed of the batches')
+    parser.add_argument('--resume', action = 'store_true', help = 'start from the saved brain instead of a new network')
+    parser.add_argument('--output', default = Pretrained_Path, help = 'file receiving the network and its optimizer, loaded by the load button of the viewer')
+    parser.add_argument('--report', type = int, default = 1000, help = 'updates between two progress reports')
+    args = parser.parse_args()
+
+    paths = sorted(set(path for pattern in args.logs for path in (glob.glob(pattern) or [pattern])))
+    dataset = TransitionDataset(paths)
+    print('{0} transitions in {1} logs'.format(len(dataset), len(paths)))
+    if args.seed is not None:
+        torch.manual_seed(args.seed)
+    brain = DQN_car(dataset.state_size, 3, 0.9)     # sensors and orientations, 3 actions, gama = 0.9, as in rohaan_mission.py
+    if args.resume:
+        brain.load(args.output)
+    pretrain(brain, dataset, args.updates, args.batch_size, seed = args.seed, report = args.report)
+    brain.save(args.output)
+
+if __name__ == '__main__':
+    main()
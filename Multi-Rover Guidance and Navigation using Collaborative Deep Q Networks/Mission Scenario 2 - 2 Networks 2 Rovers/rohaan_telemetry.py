@@ -0,0 +1,166 @@
+# Rover Telemetry
+# Training metrics recorded into an in-memory ring buffer, flushed to a CSV file by a background thread,
+# and plotted and summarised on the console by a separate process, so that the simulation never waits on disk or plots
+
+# Importing the libraries
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+from rohaan_world import Phase_Names
+
+Capacity = 4096         # Rows kept in memory until the next flush
+Flush_Period = 1.       # Seconds between two flushes of the ring buffer
+Plot_Period = 10.       # Minimum seconds between two redraws of the plots and console summaries
+Queue_Size = 64         # Batches of rows waiting for the plotting process; more are dropped
+Plot_Rows = 10000       # Rows plotted at most: past them, the history kept by the plotting process is thinned out by half
+Integer_Columns = ['timestep']  # Columns written exactly, the others with 6 significant digits
+
+# Columns of the telemetry of a rover world
+
+def world_columns(world, weight_names = None):
+    n = len(world.fleet)
+    if weight_names is None:
+        weight_names = ['reward_weight' + str(k + 1) for k in range(len(world.reward_weights))]
+    return (['timestep', 'score', 'collisions'] +                               # Goals achieved and collisions per timestep
+            ['rover' + str(i + 1) + '_score' for i in range(n)] +               # Goals achieved per timestep by each rover
+            ['brain' + str(g + 1) + '_reward' for g in range(len(world.brain_groups))] +   # Mean reward window of each brain
+            list(weight_names) +                                                # Reward coefficients selected by the cluster AI
+            (['updates_per_step'] + [phase + '_ms' for phase in Phase_Names] if world.scheduler is not None else []))   # Learning scheduled per tick
+
+def world_row(world):
+    t = max(world.timestep, 1)
+    return ([world.timestep, world.total_goals_achieved / t, world.total_collisions / t] +
+            (world.fleet.goals_achieved / t).tolist() +
+            [brain.score() for brain, indices in world.brain_groups] +
+            list(world.reward_weights) +
+            ([world.scheduler.ratio()] + [world.scheduler.phase_times[phase] * 1000. for phase in Phase_Names] if world.scheduler is not None else []))
+
+# Plotting process: redraws the plots and prints a summary at most every Plot_Period seconds
+
+def run_plotter(batches, columns, directory, period):
+    import matplotlib
+    matplotlib.use('Agg')   # No window: the figures are only saved
+    import matplotlib.pyplot as plt
+    data = np.zeros((0, len(columns)))  # Rows kept: one every stride rows received
+    stride = 1
+    received = 0
+    last = None     # Last row received, kept or not
+    fresh = False   # Rows received since the last redraw
+    last_draw = 0.
+    done = False
+    while not done:
+        batch = batches.get()
+        if batch is None:
+            done = True
+        else:
+            kept = (received + np.arange(len(batch))) % stride == 0
+            data = np.concatenate([data, batch[kept]])
+            received += len(batch)
+            last = batch[-1]
+            while len(data) > Plot_Rows:    # The memory and the redraws stay bounded however long the run
+                data = data[::2]
+                stride *= 2
+            fresh = True
+        if not fresh or (not done and time.time() - last_draw < period):
+            continue
+        fresh = False
+        last_draw = time.time()
+        column = dict((name, data[:, k]) for k, name in enumerate(columns))
+        timesteps = column['timestep']
+
+        plt.figure(11)
+        plt.plot(timesteps, column['score'])
+        plt.ylabel('Mean Goals Achieved')
+        plt.xlabel('Timesteps')
+        plt.savefig(os.path.join(directory, 'scores_plot.png'))
+        plt.close()
+
+        plt.figure(22)
+        plt.plot(timesteps, column['collisions'])
+        plt.ylabel('Mean Collisions')
+        plt.xlabel('Timesteps')
+        plt.savefig(os.path.join(directory, 'collisions_plot.png'))
+        plt.close()
+
+        rovers = [name for name in columns if name.startswith('rover')]
+        plt.figure(33)
+        for name in rovers:
+            plt.plot(timesteps, column[name])
+        plt.ylabel('Goals Achieved per Timestep')
+        plt.xlabel('Timesteps')
+        plt.legend(['Rover ' + str(i + 1) for i in range(len(rovers))])
+        plt.savefig(os.path.join(directory, 'rover_scores_plot.png'))
+        plt.close()
+
+        print('-- TELEMETRY -- Timestep: {0:.0f}  Score: {1:.4f}  Collisions: {2:.4f}'.format(last[0], last[1], last[2]))
+        for name, value in zip(columns[3:], last[3:]):
+            if not name.startswith('rover'):
+                print('{0} {1:.4f}'.format(name, value))
+
+# Telemetry of one run: record() only copies a row into memory
+
+class Telemetry(object):
+
+    def __init__(self, columns, path, plots = True, capacity = Capacity, flush_period = Flush_Period, plot_period = Plot_Period):
+        self.columns = list(columns)
+        self.buffer = np.zeros((capacity, len(self.columns)))  # Ring buffer of the rows not yet flushed
+        self.capacity = capacity
+        self.count = 0              # Rows recorded
+        self.flushed = 0            # Rows flushed
+        self.dropped = 0            # Rows overwritten before they could be flushed
+        self.lock = threading.Lock()
+        self.format = ['%d' if name in Integer_Columns else '%.6g' for name in self.columns]
+        os.makedirs(os.path.dirname(path) or '.', exist_ok = True)
+        self.file = open(path, 'w')
+        self.file.write(','.join(self.columns) + '\n')
+        self.flush_period = flush_period
+        self.batches = None
+        self.plotter = None
+        if plots:
+            context = multiprocessing.get_context('spawn')
+            self.batches = context.Queue(Queue_Size)
+            self.plotter = context.Process(target = run_plotter, args = (self.batches, self.columns, os.path.dirname(path) or '.', plot_period), daemon = True)
+            self.plotter.start()
+        self.stopped = threading.Event()
+        self.writer = threading.Thread(target = self.run, daemon = True)
+        self.writer.start()
+
+    def record(self, row):
+        with self.lock:
+            self.buffer[self.count % self.capacity] = row
+            self.count += 1
+
+    def run(self):  # Writer thread
+        while not self.stopped.wait(self.flush_period):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            n = self.count - self.flushed
+            if n > self.capacity:
+                self.dropped += n - self.capacity
+                n = self.capacity
+            rows = self.buffer[np.arange(self.count - n, self.count) % self.capacity]
+            self.flushed = self.count
+        if n == 0:
+            return
+        np.savetxt(self.file, rows, delimiter = ',', fmt = self.format)
+        self.file.flush()
+        if self.batches is not None:
+            try:
+                self.batches.put_nowait(rows)
+            except queue.Full:  # The plots fall behind, not the simulation
+                pass
+
+    def close(self):
+        self.stopped.set()
+        self.writer.join()
+        self.file.close()
+        if self.plotter is not None:
+            self.batches.put(None)
+            self.plotter.join()
@@ -0,0 +1,264 @@
+# Rover Terrain
+# Sand maps of the rover world: a dense map sized to the window, and a chunked map for very large areas,
+# stored one byte per cell in lazily allocated chunks, optionally backed by memory-mapped files
+
+# Importing the libraries
+import collections
+import glob
+import os
+import numpy as np
+
+Chunk_Size = 256            # Cells on each edge of a chunk
+Sat_Cache_Size = 64         # Summed-area tables of chunks kept in memory, the least recently used are dropped
+
+# Both maps hold a value per cell (1 if there is sand, 0 otherwise) and answer the same queries.
+# Rectangles are given as [x0, x1) x [y0, y1), already clipped to the map by the world.
+
+def load_cells(cells, sat, values):    # Sets every cell at once, then rebuilds the summed-area table in one pass
+    cells[:] = values
+    sat[1:, 1:] = np.cumsum(values, 0, dtype = np.int32).cumsum(1)
+
+def fill_cells(cells, sat, x0, x1, y0, y1, value):  # Sets one rectangle of cells and updates their summed-area table for this dirty rectangle
+    if x0 == x1 or y0 == y1:
+        return
+    delta = value - cells[x0:x1, y0:y1].astype(np.int32)
+    cells[x0:x1, y0:y1] = value
+    if not delta.any():
+        return
+    delta = delta.cumsum(0).cumsum(1)   # Change of the summed-area table inside the rectangle
+    sat[x0 + 1:x1 + 1, y0 + 1:y1 + 1] += delta
+    sat[x1 + 1:, y0 + 1:y1 + 1] += delta[-1, :]     # Past the rectangle, the change is its column or row totals
+    sat[x0 + 1:x1 + 1, y1 + 1:] += delta[:, -1:]
+    sat[x1 + 1:, y1 + 1:] += delta[-1, -1]
+
+class DenseTerrain(object):
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cells = np.zeros((width, height))  # One cell per pixel
+        self.sat = np.zeros((width + 1, height + 1), dtype = np.int32)  # Summed-area table of the cells, kept in sync with them
+
+    def sum(self, x0, x1, y0, y1):  # Sand in one rectangle, in four lookups of the summed-area table
+        sat = self.sat
+        return int(sat[x1, y1] - sat[x0, y1] - sat[x1, y0] + sat[x0, y0])
+
+    def rect_sums(self, x0, x1, y0, y1):    # Sand in each rectangle of arrays of rectangles
+        sat = self.sat
+        return sat[x1, y1] - sat[x0, y1] - sat[x1, y0] + sat[x0, y0]
+
+    def values(self, x, y):
+        return self.cells[x, y]
+
+    def region(self, x0, x1, y0, y1):   # Copy of the cells of one rectangle, e.g. to display a viewport
+        return self.cells[x0:x1, y0:y1].astype(np.uint8)
+
+    def fill(self, x0, x1, y0, y1, value):
+        fill_cells(self.cells, self.sat, x0, x1, y0, y1, value)
+
+    def load(self, values):     # Every cell of the map, e.g. an imported map: a (width, height) array of 0 and 1
+        load_cells(self.cells, self.sat, values)
+
+    def clear(self):
+        self.cells[:] = 0
+        self.sat[:] = 0
+
+    def flush(self):
+        pass
+
+# Dense map over arrays given by the caller, e.g. views of memory shared by the processes of a sharded world
+
+class SharedTerrain(DenseTerrain):
+
+    def __init__(self, cells, sat):
+        self.width, self.height = cells.shape
+        self.cells = cells      # (width, height) cells, one byte each
+        self.sat = sat          # (width + 1, height + 1) summed-area table, int32
+
+# Stack of E dense maps of the same size, one per world of a vectorized environment, queried for many worlds at once
+
+class TerrainStack(object):
+
+    def __init__(self, n_maps, width, height):
+        self.width = width
+        self.height = height
+        self.cells = np.zeros((n_maps, width, height), dtype = np.uint8)    # One byte per cell of each map
+        self.sat = np.zeros((n_maps, width + 1, height + 1), dtype = np.int32)  # Summed-area table of each map
+
+    def __len__(self):
+        return len(self.cells)
+
+    def maps(self, index):  # Maps selected by index: one map, a list of maps, or None for every map
+        return range(len(self)) if index is None else np.atleast_1d(index).tolist()
+
+    def rect_sums(self, index, x0, x1, y0, y1):     # Sand in each rectangle, of the map of the same position in the index array
+        sat = self.sat
+        return sat[index, x1, y1] - sat[index, x0, y1] - sat[index, x1, y0] + sat[index, x0, y0]
+
+    def values(self, index, x, y):
+        return self.cells[index, x, y]
+
+    def region(self, index, x0, x1, y0, y1):
+        return self.cells[index, x0:x1, y0:y1].copy()
+
+    def fill(self, index, x0, x1, y0, y1, value):   # Sets one rectangle of the maps selected by index
+        for k in self.maps(index):
+            fill_cells(self.cells[k], self.sat[k], x0, x1, y0, y1, value)
+
+    def load(self, index, values):  # Every cell of the maps selected by index
+        for k in self.maps(index):
+            load_cells(self.cells[k], self.sat[k], values)
+
+    def clear(self, index = None):
+        for k in self.maps(index):
+            self.cells[k] = 0
+            self.sat[k] = 0
+
+    def flush(self):
+        pass
+
+# Chunked map: only the chunks holding sand exist, and they live in files when a directory is given
+
+class ChunkedTerrain(object):
+
+    def __init__(self, width, height, path = None, chunk_size = Chunk_Size, sat_cache_size = Sat_Cache_Size):
+        self.width = width
+        self.height = height
+        self.path = path                    # Directory of the chunk files, None to keep the chunks in memory
+        self.chunk_size = chunk_size
+        self.chunks = {}                    # Chunks opened so far, by (chunk x, chunk y)
+        self.sats = collections.OrderedDict()   # Summed-area tables of the chunks recently read, by (chunk x, chunk y)
+        self.sat_cache_size = sat_cache_size
+        if path is not None:
+            os.makedirs(path, exist_ok = True)
+
+    def chunk_path(self, cx, cy):
+        return os.path.join(self.path, 'chunk_{0}_{1}.u8'.format(cx, cy))
+
+    def chunk(self, cx, cy, create = False):    # Chunk (cx, cy), or None if it holds no sand and create is False
+        chunk = self.chunks.get((cx, cy))
+        if chunk is not None:
+            return chunk
+        shape = (self.chunk_size, self.chunk_size)
+        if self.path is None:
+            if not create:
+                return None
+            chunk = np.zeros(shape, dtype = np.uint8)
+        elif os.path.exists(self.chunk_path(cx, cy)):
+            chunk = np.memmap(self.chunk_path(cx, cy), dtype = np.uint8, mode = 'r+', shape = shape)
+        elif create:
+            chunk = np.memmap(self.chunk_path(cx, cy), dtype = np.uint8, mode = 'w+', shape = shape)
+        else:
+            return None
+        self.chunks[(cx, cy)] = chunk
+        return chunk
+
+    def chunk_sat(self, cx, cy):    # Summed-area table of chunk (cx, cy), or None if it holds no sand
+        sat = self.sats.get((cx, cy))
+        if sat is not None:
+            self.sats.move_to_end((cx, cy))
+            return sat
+        chunk = self.chunk(cx, cy)
+        if chunk is None:
+            return None
+        sat = np.zeros((self.chunk_size + 1, self.chunk_size + 1), dtype = np.int32)
+        sat[1:, 1:] = chunk.cumsum(0, dtype = np.int32).cumsum(1)
+        self.sats[(cx, cy)] = sat
+        if len(self.sats) > self.sat_cache_size:
+            self.sats.popitem(last = False)
+        return sat
+
+    def spans(self, start, stop):   # (chunk, first cell, last cell + 1) of the chunks covering [start, stop), in chunk coordinates
+        c = self.chunk_size
+        for k in range(start // c, (stop - 1) // c + 1):
+            yield k, max(start - k * c, 0), min(stop - k * c, c)
+
+    def sum(self, x0, x1, y0, y1):
+        total = 0
+        for cx, a0, a1 in self.spans(x0, x1):
+            for cy, b0, b1 in self.spans(y0, y1):
+                sat = self.chunk_sat(cx, cy)
+                if sat is not None:
+                    total += int(sat[a1, b1] - sat[a0, b1] - sat[a1, b0] + sat[a0, b0])
+        return total
+
+    def rect_sums(self, x0, x1, y0, y1):    # Each rectangle is at most a chunk wide, so it spans at most two chunks per axis
+        shape = np.shape(x0)
+        x0, x1, y0, y1 = [np.ravel(a) for a in (x0, x1, y0, y1)]
+        c = self.chunk_size
+        total = np.zeros(len(x0), dtype = np.int64)
+        x_split = np.minimum((x0 // c + 1) * c, x1)     # End of the part of each rectangle in its first chunk
+        y_split = np.minimum((y0 // c + 1) * c, y1)
+        for a0, a1 in ((x0, x_split), (x_split, x1)):
+            for b0, b1 in ((y0, y_split), (y_split, y1)):
+                part = np.flatnonzero((a1 > a0) & (b1 > b0))
+                if len(part) == 0:
+                    continue
+                cx = a0[part] // c
+                cy = b0[part] // c
+                keys = (cx << 32) + cy
+                for key in np.unique(keys).tolist():
+                    sat = self.chunk_sat(key >> 32, key & 0xffffffff)
+                    if sat is None:
+                        continue
+                    sel = part[keys == key]
+                    left = a0[sel] - (key >> 32) * c
+                    right = a1[sel] - (key >> 32) * c
+                    bottom = b0[sel] - (key & 0xffffffff) * c
+                    top = b1[sel] - (key & 0xffffffff) * c
+                    total[sel] += sat[right, top] - sat[left, top] - sat[right, bottom] + sat[left, bottom]
+        return total.reshape(shape)
+
+    def values(self, x, y):
+        shape = np.shape(x)
+        x = np.ravel(x)
+        y = np.ravel(y)
+        c = self.chunk_size
+        result = np.zeros(len(x), dtype = np.uint8)
+        keys = ((x // c) << 32) + y // c
+        for key in np.unique(keys).tolist():
+            chunk = self.chunk(key >> 32, key & 0xffffffff)
+            if chunk is not None:
+                sel = np.flatnonzero(keys == key)
+                result[sel] = chunk[x[sel] % c, y[sel] % c]
+        return result.reshape(shape)
+
+    def region(self, x0, x1, y0, y1):
+        c = self.chunk_size
+        result = np.zeros((x1 - x0, y1 - y0), dtype = np.uint8)
+        for cx, a0, a1 in self.spans(x0, x1):
+            for cy, b0, b1 in self.spans(y0, y1):
+                chunk = self.chunk(cx, cy)
+                if chunk is not None:
+                    result[cx * c + a0 - x0:cx * c + a1 - x0, cy * c + b0 - y0:cy * c + b1 - y0] = chunk[a0:a1, b0:b1]
+        return result
+
+    def fill(self, x0, x1, y0, y1, value):
+        if x0 == x1 or y0 == y1:
+            return
+        for cx, a0, a1 in self.spans(x0, x1):
+            for cy, b0, b1 in self.spans(y0, y1):
+                chunk = self.chunk(cx, cy, create = value != 0)     # Clearing sand never allocates a chunk
+                if chunk is not None:
+                    chunk[a0:a1, b0:b1] = value
+                    self.sats.pop((cx, cy), None)
+
+    def load(self, values):     # Every cell of the map: only the chunks holding sand are created
+        self.clear()
+        for cx, a0, a1 in self.spans(0, self.width):
+            for cy, b0, b1 in self.spans(0, self.height):
+                block = values[cx * self.chunk_size + a0:cx * self.chunk_size + a1, cy * self.chunk_size + b0:cy * self.chunk_size + b1]
+                if block.any():
+                    self.chunk(cx, cy, create = True)[a0:a1, b0:b1] = block
+
+    def clear(self):
+        self.chunks = {}
+        self.sats.clear()
+        if self.path is not None:
+            for path in glob.glob(os.path.join(self.path, 'chunk_*.u8')):
+                os.remove(path)
+
+    def flush(self):    # Writes the chunks changed in memory to their files
+        for chunk in self.chunks.values():
+            if isinstance(chunk, np.memmap):
+                chunk.flush()
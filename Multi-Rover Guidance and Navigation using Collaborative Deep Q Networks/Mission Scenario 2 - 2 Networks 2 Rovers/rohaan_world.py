@@ -0,0 +1,464 @@
+# Rover World
+# Headless simulation core: sand map, rovers, goals, rewards and learning, without Kivy
+
+# Importing the libraries
+import math
+import time
+import numpy as np
+
+from rohaan_terrain import DenseTerrain
+
+Car_Speed = 6               # Normal speed of a rover
+Sand_Speed = 1              # Speed of a rover when it is on the sand
+Sensor_Distance = 30        # Distance between a rover and its sensors
+Sensor_Angles = [0, 30, -30]    # Heading of each sensor relative to the rover (degrees)
+Heading_Steps = 360         # Headings of the trigonometric tables of the sensors: one per degree, the rovers turning by whole degrees
+Sensor_Half_Width = 10      # Sensors measure the sand density in a 20x20 window (at most Map_Margin)
+Map_Margin = 10             # Rovers and goals are kept this far away from the edges of the map
+Proximity_To_Goal = 50      # How close to the goal is good enough
+Duration_Window_Size = 20   # Number of goal-to-goal durations kept per rover
+action2rotation = np.array([0,20,-20]) # action = 0 => no rotation, action = 1 => rotate 20 degres, action = 2 => rotate -20 degres
+Reward_Names = ['living', 'closer', 'sand', 'wall', 'collision', 'goal']    # Reward coefficients of a rover
+Tick_Budget = 1. / 60.      # Seconds per tick aimed at by the scheduler: one frame of the viewer
+Min_Updates_Per_Step = 0.1  # Bounds of the learn() calls per tick and network chosen by the scheduler
+Max_Updates_Per_Step = 10.
+Timing_Smoothing = 0.05     # Weight of the last tick in the moving averages of the phase times
+Phase_Names = ['sensing', 'acting', 'rewards', 'learning', 'rendering']     # Phases of a tick timed by the scheduler
+
+# Sensors of a rover: rays fanned around its heading, each sampling the sand at one or more distances
+
+class SensorArray(object):
+
+    def __init__(self, angles = Sensor_Angles, distances = [Sensor_Distance]):
+        self.angles = np.asarray(angles, dtype = float)         # Heading of each ray relative to the rover (degrees)
+        self.distances = np.asarray(distances, dtype = float)   # Distance of each sample along a ray; the last one is shown as the sensor
+        headings = np.radians(np.arange(Heading_Steps) * 360. / Heading_Steps)[:, None, None] + np.radians(self.angles)[None, :, None]
+        self.table_x = (np.cos(headings) * self.distances).reshape(Heading_Steps, -1)  # Offsets of the samples from the rover, by heading: (headings, rays * samples)
+        self.table_y = (np.sin(headings) * self.distances).reshape(Heading_Steps, -1)
+
+    @classmethod
+    def fan(cls, rays, span, distance = Sensor_Distance, samples = 1):  # rays evenly spread over span degrees, each sampled evenly up to distance
+        angles = np.linspace(-span / 2., span / 2., rays) if rays > 1 else [0.]
+        return cls(angles, distance * np.arange(1, samples + 1) / samples)
+
+    def __len__(self):
+        return len(self.angles)
+
+    def samples(self, x, y, angle):     # Positions of the samples of every ray of every rover, (N, rays, samples), from one lookup of the tables
+        heading = np.rint(angle * Heading_Steps / 360.).astype(int) % Heading_Steps
+        shape = (len(x), len(self.angles), len(self.distances))
+        return ((x[:, None] + self.table_x[heading]).reshape(shape),
+                (y[:, None] + self.table_y[heading]).reshape(shape))
+
+# Class holding the state of N rovers, one NumPy array of length N per quantity
+
+class RoverFleet(object):
+
+    def __init__(self, brains, positions, velocities, rewards, sensor_array = None):
+        n = len(brains)
+        positions = np.asarray(positions, dtype = float).reshape(n, 2)
+        self.sensor_array = sensor_array if sensor_array is not None else SensorArray()
+        self.n = n
+        self.brains = list(brains)          # AI playing the actions of each rover (rovers may share one)
+        self.x = positions[:, 0].copy()     # Positions of the rovers
+        self.y = positions[:, 1].copy()
+        self.angle = np.zeros(n)            # Angle between the x-axis of the map and the axis of each rover
+        self.velocity = np.asarray(velocities, dtype = float).reshape(n, 2).copy()
+        self.sensors = np.repeat(positions[:, None, :], len(self.sensor_array), axis = 1)   # Positions of the sensors (tips of the rays), (N, sensors, 2)
+        self.signals = np.zeros((n, len(self.sensor_array)))    # Sand density measured by each sensor, averaged along its ray
+        self.orientation = np.zeros(n)      # Direction of each rover with respect to its goal
+        self.goal_x = np.zeros(n)
+        self.goal_y = np.zeros(n)
+        self.last_distance = np.zeros(n)    # Last distance from each rover to its goal
+        self.last_reward = np.zeros(n)
+        self.rewards = {}                   # Reward coefficients, an array per name of Reward_Names (a scalar applies to every rover)
+        for name in Reward_Names:
+            self.rewards[name] = np.zeros(n)
+            self.rewards[name][:] = rewards.get(name, 0)
+        self.goals_achieved = np.zeros(n, dtype = int)
+        self.last_goal = np.zeros(n, dtype = int)
+        self.duration = [[] for i in range(n)]  # Timesteps taken by each rover to reach its last goals
+
+    def __len__(self):
+        return self.n
+
+# Uniform grid over the map, hashing each rover to its cell so that nearby rovers are found without testing every pair
+
+class SpatialHash(object):
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.x = np.zeros(0)                # Positions hashed at the last build
+        self.y = np.zeros(0)
+        self.order = np.zeros(0, dtype = int)   # Indices of the rovers sorted by cell
+        self.keys = np.zeros(0, dtype = np.int64)   # Sorted cell keys, one per rover
+
+    def cells(self, x, y):
+        return (np.floor(x / self.cell_size).astype(np.int64),
+                np.floor(y / self.cell_size).astype(np.int64))
+
+    def key(self, cell_x, cell_y):
+        return (cell_x << 32) + cell_y
+
+    def build(self, x, y):  # Hashes the positions of the rovers; called once per tick
+        self.x = x.copy()
+        self.y = y.copy()
+        keys = self.key(*self.cells(x, y))
+        self.order = np.argsort(keys, kind = 'stable')
+        self.keys = keys[self.order]
+
+    def candidates(self, x, y, radius):     # (query index, rover index) of the rovers in the cells around each query point
+        cell_x, cell_y = self.cells(x, y)
+        reach = np.arange(-int(math.ceil(radius / self.cell_size)), int(math.ceil(radius / self.cell_size)) + 1)
+        stencil_x = np.repeat(reach, len(reach))    # Offsets of the neighbouring cells, the cell itself included
+        stencil_y = np.tile(reach, len(reach))
+        keys = self.key(cell_x[:, None] + stencil_x, cell_y[:, None] + stencil_y).ravel()
+        start = np.searchsorted(self.keys, keys, side = 'left')
+        counts = np.searchsorted(self.keys, keys, side = 'right') - start
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        queries = np.repeat(np.arange(len(keys)) // len(stencil_x), counts)
+        return queries, self.order[np.repeat(start, counts) + offsets]
+
+    def pairs(self, radius):    # Pairs (i < j) of hashed rovers closer than radius on both axes
+        first, second = self.candidates(self.x, self.y, radius)
+        close = (first < second) & (np.abs(self.x[first] - self.x[second]) < radius) & (np.abs(self.y[first] - self.y[second]) < radius)
+        return first[close], second[close]
+
+    def within(self, x, y, radius):     # (query index, rover index) of the hashed rovers within radius of each point (x, y)
+        x = np.atleast_1d(np.asarray(x, dtype = float))
+        y = np.atleast_1d(np.asarray(y, dtype = float))
+        queries, rovers = self.candidates(x, y, radius)
+        close = (self.x[rovers] - x[queries])**2 + (self.y[rovers] - y[queries])**2 < radius**2
+        return queries[close], rovers[close]
+
+# Scheduler of the learning: times each phase of the ticks, and spends the time left in the budget of a tick on learn() calls
+
+class TickScheduler(object):
+
+    def __init__(self, budget = Tick_Budget, min_updates = Min_Updates_Per_Step, max_updates = Max_Updates_Per_Step, smoothing = Timing_Smoothing):
+        self.budget = budget
+        self.min_updates = min_updates
+        self.max_updates = max_updates
+        self.smoothing = smoothing
+        self.phase_times = dict((name, 0.) for name in Phase_Names)    # Moving average of the seconds spent per tick in each phase
+        self.update_time = 0.       # Moving average of the seconds taken by one learn() call of every scheduled network
+        self.updates_per_step = 1.  # learn() calls per tick and network, adapted to the budget
+        self.credit = 0.            # Fraction of a learn() call carried over to the next tick
+        self.steps = 0              # Ticks scheduled
+        self.updates = 0            # learn() calls per network done over these ticks
+        self.last = time.perf_counter()     # End of the last phase timed
+
+    def average(self, average, value):
+        return average + self.smoothing * (value - average)
+
+    def record(self, phase, seconds):   # Time of a phase timed elsewhere, e.g. the rendering of the viewer
+        self.phase_times[phase] = self.average(self.phase_times[phase], seconds)
+
+    def start(self):
+        self.last = time.perf_counter()
+
+    def lap(self, phase):   # Ends a phase started at the end of the last one
+        now = time.perf_counter()
+        self.record(phase, now - self.last)
+        self.last = now
+        return now
+
+    def plan(self):     # learn() calls of this tick: as many as the time left in the budget allows
+        if self.update_time > 0:
+            spare = self.budget - sum(seconds for phase, seconds in self.phase_times.items() if phase != 'learning')
+            self.updates_per_step = min(max(spare / self.update_time, self.min_updates), self.max_updates)
+        self.credit += self.updates_per_step
+        updates = int(self.credit)
+        self.credit -= updates
+        return updates
+
+    def learned(self, updates, calls):  # Ends the learning phase, in which every network made updates learn() calls (calls in total)
+        start = self.last
+        seconds = self.lap('learning') - start
+        self.steps += 1
+        if calls:   # The networks learn once their memories hold enough samples
+            self.updates += updates
+            self.update_time = self.average(self.update_time, seconds / updates) if self.update_time else seconds / updates
+
+    def ratio(self):    # learn() calls per tick and network achieved so far
+        return self.updates / max(self.steps, 1)
+
+# Class holding the whole world, stepped as fast as the CPU allows
+
+class RoverWorld(object):
+
+    def __init__(self, width, height, fleet, collision_radius, score_period, cluster_ai = None, checkpoint_period = 0, seed = None, verbose = True, terrain = None, scheduler = None, transition_log = None, cluster_period = 1):
+        self.width = width                  # Width of the map (horizontal edge)
+        self.height = height                # Height of the map (vertical edge)
+        self.terrain = terrain if terrain is not None else DenseTerrain(width, height)   # Sand map, 1 if there is sand, 0 otherwise
+        self.fleet = fleet
+        self.collision_radius = collision_radius
+        self.spatial_hash = SpatialHash(collision_radius)   # Positions of the rovers at the end of the last step, by cell
+        self.score_period = score_period    # Timesteps between two points of the score curves
+        self.cluster_ai = cluster_ai        # Optional AI selecting the reward coefficients of the rovers
+        self.cluster_period = cluster_period    # Timesteps between two actions (and learning steps) of the cluster AI, the rovers acting at every timestep
+        self.checkpoint_period = checkpoint_period  # Timesteps between two save/load of the best models (0 to disable)
+        self.verbose = verbose
+        self.scheduler = scheduler          # Optional scheduler of the learning of the networks, which then no longer learn once per update
+        self.transition_log = transition_log    # Optional log receiving the transition of every rover at every timestep
+        self.last_observations = None       # States and actions of the last step, logged with their rewards and next states
+        self.last_actions = None
+        self.rng = np.random.default_rng(seed)
+        self.timestep = 0
+        self.total_goals_achieved = 0
+        self.total_collisions = 0
+        self.score_t = []                   # Goals achieved per timestep
+        self.collisions_t = []              # Collisions per timestep
+        self.rover_score_t = []             # Goals achieved per timestep by each rover, one array of length N per point
+        self.goals_reached = []             # (rover index, goal_x, goal_y) of the goals reached during the last step
+        self.reward_weights = []            # Reward coefficients selected by the cluster AI
+        self.last_cluster_reward = 0        # Reward given to the cluster AI at its last action: the mean of the timesteps since the one before
+        self.cluster_reward_sum = 0.        # Rewards of the cluster AI summed since its last action
+        self.cluster_window = 0             # Timesteps since its last action
+        self.brain_groups = []              # (brain, indices of the rovers it drives): rovers sharing a brain act in one batch
+        for i, brain in enumerate(fleet.brains):
+            for group_brain, indices in self.brain_groups:
+                if group_brain is brain:
+                    indices.append(i)
+                    break
+            else:
+                self.brain_groups.append((brain, [i]))
+        self.brain_groups = [(brain, np.array(indices)) for brain, indices in self.brain_groups]
+        self.brain_scores = [[] for group in self.brain_groups]    # Mean score curve (sliding window of the rewards) of each brain
+        self.scheduled_brains = []          # Networks learning when the scheduler tells them to; those with a learner thread keep it
+        if scheduler is not None:
+            brains = [brain for brain, indices in self.brain_groups] + ([cluster_ai] if cluster_ai is not None else [])
+            self.scheduled_brains = [brain for brain in brains if brain.learner is None]
+            for brain in self.scheduled_brains:
+                brain.scheduled = True
+        fleet.goal_x[:], fleet.goal_y[:] = self.random_goals(len(fleet))
+
+    def random_goals(self, n):
+        return (self.rng.integers(Map_Margin, self.width - Map_Margin, size = n, endpoint = True),
+                self.rng.integers(Map_Margin, self.height - Map_Margin, size = n, endpoint = True))
+
+    # Sand map
+
+    def sand_sum(self, x0, x1, y0, y1):     # Sand in the rectangle [x0, x1) x [y0, y1)
+        x0 = min(max(x0, 0), self.width)
+        x1 = min(max(x1, x0), self.width)
+        y0 = min(max(y0, 0), self.height)
+        y1 = min(max(y1, y0), self.height)
+        return self.terrain.sum(x0, x1, y0, y1)
+
+    def sand_density(self, x, y):   # Density of sand in the window around each point (x, y)
+        inside_x = np.minimum(np.maximum(x, Map_Margin), self.width - Map_Margin)    # Inside the margins, the windows need no clipping
+        inside_y = np.minimum(np.maximum(y, Map_Margin), self.height - Map_Margin)
+        outside = (inside_x != x) | (inside_y != y)
+        x = inside_x.astype(int)
+        y = inside_y.astype(int)
+        w = Sensor_Half_Width
+        density = self.terrain.rect_sums(x - w, x + w, y - w, y + w) / (4. * w * w)
+        return np.where(outside, 1., density)   # Out of the map: the sensor detects full sand
+
+    def is_sand(self, x, y):
+        x = np.minimum(np.maximum(x.astype(int), 0), self.width - 1)
+        y = np.minimum(np.maximum(y.astype(int), 0), self.height - 1)
+        return self.terrain.values(x, y) > 0
+
+    def fill_sand(self, x0, x1, y0, y1, value):     # Sets the sand of the rectangle [x0, x1) x [y0, y1)
+        x0 = min(max(x0, 0), self.width)
+        x1 = min(max(x1, x0), self.width)
+        y0 = min(max(y0, 0), self.height)
+        y1 = min(max(y1, y0), self.height)
+        self.terrain.fill(x0, x1, y0, y1, value)
+
+    def load_sand(self, cells):     # Sand of every cell, e.g. of a map imported by rohaan_maps.py: a (width, height) array of 0 and 1
+        if np.shape(cells) != (self.width, self.height):
+            raise ValueError('a map of {0}x{1} cells does not fit a world of {2}x{3}'.format(np.shape(cells)[0], np.shape(cells)[1], self.width, self.height))
+        self.terrain.load(cells)
+
+    def set_sand(self, x, y, value):    # Sand of a single cell
+        x = int(x)
+        y = int(y)
+        self.fill_sand(x, x + 1, y, y + 1, value)
+
+    def paint_sand(self, x, y, value, half_width = Sensor_Half_Width):   # Sand of the square brush centred on (x, y)
+        x = int(x)
+        y = int(y)
+        self.fill_sand(x - half_width, x + half_width, y - half_width, y + half_width, value)
+
+    def clear_sand(self):
+        self.terrain.clear()
+
+    def sand_region(self, x0, x1, y0, y1):  # Sand of the rectangle [x0, x1) x [y0, y1), e.g. to display a viewport of the map
+        x0 = min(max(x0, 0), self.width)
+        x1 = min(max(x1, x0), self.width)
+        y0 = min(max(y0, 0), self.height)
+        y1 = min(max(y1, y0), self.height)
+        return self.terrain.region(x0, x1, y0, y1)
+
+    # Rovers
+
+    def move(self, rotation):
+        fleet = self.fleet
+        fleet.x += fleet.velocity[:, 0]     # Updating the positions of the rovers according to their last positions and velocities
+        fleet.y += fleet.velocity[:, 1]
+        fleet.angle += rotation
+        sample_x, sample_y = fleet.sensor_array.samples(fleet.x, fleet.y, fleet.angle)
+        fleet.sensors[:, :, 0] = sample_x[:, :, -1]
+        fleet.sensors[:, :, 1] = sample_y[:, :, -1]
+        fleet.signals = self.sand_density(sample_x, sample_y).mean(axis = 2)     # Every sample of every rover in one read of the sand map
+
+    def step(self):     # One discrete time t: every rover senses, acts, moves and gets its reward
+        self.timestep += 1
+        self.goals_reached = []
+        scheduler = self.scheduler
+        if scheduler is not None:
+            scheduler.start()
+        observations = self.observe()
+        if self.transition_log is not None:
+            self.log_transitions(observations)
+        if scheduler is not None:
+            scheduler.lap('sensing')
+        actions = self.act(observations)
+        if self.transition_log is not None:
+            self.last_observations = observations
+            self.last_actions = actions
+        if scheduler is not None:
+            scheduler.lap('acting')
+        self.step_fleet(actions)
+        self.collide()
+        if self.cluster_ai is not None:
+            self.update_cluster()
+        if scheduler is not None:
+            scheduler.lap('rewards')
+            updates = scheduler.plan()
+            scheduler.learned(updates, self.train(updates))
+        if self.goals_reached:
+            self.total_goals_achieved += 1
+        if self.timestep % self.score_period == 0:
+            self.score_t.append(self.total_goals_achieved / self.timestep)
+            self.collisions_t.append(self.total_collisions / self.timestep)
+            self.rover_score_t.append(self.fleet.goals_achieved / self.timestep)
+        if self.checkpoint_period and self.timestep % self.checkpoint_period == 0:
+            self.save_load_best_models()
+
+    def observe(self):  # Input state vectors of the rovers, (N, 5): 3 signals, orientation and -orientation
+        fleet = self.fleet
+        xx = fleet.goal_x - fleet.x     # Difference of x-coordinates between the goals and the rovers
+        yy = fleet.goal_y - fleet.y     # Difference of y-coordinates between the goals and the rovers
+        vx = fleet.velocity[:, 0]
+        vy = fleet.velocity[:, 1]
+        fleet.orientation = -np.arctan2(vx * yy - vy * xx, vx * xx + vy * yy) / math.pi    # Same as kivy's Vector(velocity).angle((xx, yy)) / 180.
+        return np.column_stack([fleet.signals, fleet.orientation, -fleet.orientation])
+
+    def log_transitions(self, observations):    # The rewards of the last actions are known once the rovers moved, the next states now
+        if self.last_observations is not None:
+            self.transition_log.append(self.timestep - 1, self.last_observations, self.last_actions, self.fleet.last_reward, observations)
+
+    def act(self, signals):     # Action of every rover, with one batched update per brain shared by several rovers
+        fleet = self.fleet
+        actions = np.zeros(len(fleet), dtype = int)
+        for g, (brain, indices) in enumerate(self.brain_groups):
+            if len(indices) == 1:
+                i = indices[0]
+                actions[i] = brain.update(fleet.last_reward[i].item(), signals[i].tolist())
+            else:
+                actions[indices] = brain.update_batch(fleet.last_reward[indices].tolist(), signals[indices].tolist())
+            self.brain_scores[g].append(brain.score())
+        return actions
+
+    def train(self, updates):   # learn() calls of the networks scheduled by the world; returns the calls done
+        return sum(brain.train(updates) for brain in self.scheduled_brains if brain is not self.cluster_ai or self.cluster_due())
+
+    def step_fleet(self, actions):
+        fleet = self.fleet
+        rewards = fleet.rewards
+        self.move(action2rotation[actions])
+        distance = np.sqrt((fleet.x - fleet.goal_x)**2 + (fleet.y - fleet.goal_y)**2)
+
+        on_sand = self.is_sand(fleet.x, fleet.y)    # The rovers are slowed down on the sand
+        speed = np.where(on_sand, Sand_Speed, Car_Speed)
+        angle = np.radians(fleet.angle)
+        fleet.velocity[:, 0] = speed * np.cos(angle)
+        fleet.velocity[:, 1] = speed * np.sin(angle)
+        fleet.last_reward = np.where(on_sand, rewards['sand'], rewards['living'] + rewards['closer'] * (distance < fleet.last_distance))
+
+        on_wall = ((fleet.x < Map_Margin) | (fleet.x > self.width - Map_Margin) |
+                   (fleet.y < Map_Margin) | (fleet.y > self.height - Map_Margin))
+        np.minimum(np.maximum(fleet.x, Map_Margin, out = fleet.x), self.width - Map_Margin, out = fleet.x)    # The rovers are kept inside the map, but get a bad reward
+        np.minimum(np.maximum(fleet.y, Map_Margin, out = fleet.y), self.height - Map_Margin, out = fleet.y)
+        fleet.last_reward[on_wall] = rewards['wall'][on_wall]
+
+        reached = np.flatnonzero(distance < Proximity_To_Goal)    # The rovers reaching their goals
+        if len(reached):
+            self.reach_goals(reached)
+        fleet.last_distance = distance
+
+    def reach_goals(self, reached):
+        fleet = self.fleet
+        self.goals_reached = list(zip(reached.tolist(), fleet.goal_x[reached].tolist(), fleet.goal_y[reached].tolist()))
+        fleet.goal_x[reached], fleet.goal_y[reached] = self.random_goals(len(reached))
+        fleet.goals_achieved[reached] += 1
+        fleet.last_reward[reached] = fleet.rewards['goal'][reached]
+        for i in reached.tolist():
+            if self.verbose:
+                print('Car ' + str(i + 1) + ' Reached its goal at Timestep: ' + str(self.timestep) + ' after: ' + str(self.timestep - fleet.last_goal[i]))
+                print('Recent Score: ' + str(fleet.brains[i].score()))
+            if fleet.last_goal[i] != 0:
+                fleet.duration[i].append(self.timestep - fleet.last_goal[i])
+            if len(fleet.duration[i]) > Duration_Window_Size:
+                del fleet.duration[i][0]
+        fleet.last_goal[reached] = self.timestep
+
+    def collide(self):
+        fleet = self.fleet
+        self.spatial_hash.build(fleet.x, fleet.y)
+        first, second = self.spatial_hash.pairs(self.collision_radius)  # The pairs of rovers colliding
+        if len(first) == 0:
+            return
+        colliding = np.union1d(first, second)
+        fleet.x[colliding] = 1  # Slow down
+        fleet.last_reward[colliding] = fleet.rewards['collision'][colliding]   # Large penalty
+        self.total_collisions += len(first)
+        if self.verbose:
+            print('COLLISION!\n' * len(first), end = '')
+        self.spatial_hash.build(fleet.x, fleet.y)
+
+    def neighbours(self, x, y, radius):     # (query index, rover index) of the rovers within radius of each point, e.g. of a sensor
+        return self.spatial_hash.within(x, y, radius)
+
+    # Cluster
+
+    def cluster_state(self):    # Position, velocity and orientation of every rover, followed by every goal
+        fleet = self.fleet
+        rovers = np.column_stack([fleet.x, fleet.y, fleet.velocity, fleet.orientation])
+        goals = np.column_stack([fleet.goal_x, fleet.goal_y])
+        return np.concatenate([rovers.ravel(), goals.ravel()]).tolist()
+
+    def cluster_due(self):  # True at the timesteps the cluster AI acts and learns
+        return self.timestep % self.cluster_period == 0
+
+    def update_cluster(self):
+        if self.cluster_due():
+            self.act_cluster()
+        self.cluster_reward_sum += 50 if self.goals_reached else -10
+        self.cluster_window += 1
+
+    def act_cluster(self):
+        if self.cluster_window:
+            self.last_cluster_reward = self.cluster_reward_sum / self.cluster_window
+        self.cluster_reward_sum = 0.
+        self.cluster_window = 0
+        cluster_actions = self.cluster_ai.update(self.last_cluster_reward, self.cluster_state())
+        weights = [action.item() for action in cluster_actions]
+        # Actions: living penalty, getting closer bonus, collision penalty, sand penalty and goal reward for each rover,
+        # of which the first set of coefficients drives every rover. The goal reward is kept fixed.
+        self.reward_weights = weights
+        rewards = self.fleet.rewards
+        rewards['living'][:] = weights[0]
+        rewards['closer'][:] = weights[1]
+        rewards['collision'][:] = weights[2]
+        rewards['sand'][:] = weights[3]
+
+    def save_load_best_models(self):
+        if self.cluster_ai is not None:
+            self.cluster_ai.save_load_best_model(score = self.score_t[-1])
+        for i, brain in enumerate(self.fleet.brains):
+            brain.save_load_best_model(score = self.rover_score_t[-1][i])